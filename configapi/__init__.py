@@ -2,4 +2,6 @@ __version__ = '0.0.7'
 
 from .types import ConfigValue, ConfigDict
 from .sources import FileConfigSource, PackageResourceConfigSource
+from .codecs import Codec, register_codec
+from .diff import ConfigDiff
 from .configs import Configs
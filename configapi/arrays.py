@@ -0,0 +1,64 @@
+from array import array
+from copy import deepcopy
+from typing import Any
+
+from .types import ConfigDict, ConfigValue
+
+
+COMPACT_MIN_LENGTH = 16
+
+_TYPECODES = {int: 'q', float: 'd'}
+_NUMPY = None
+
+
+def _numpy() -> Any:
+    # NumPy is optional and only imported once the first array is compacted.
+    global _NUMPY
+    if _NUMPY is None:
+        try:
+            import numpy
+            _NUMPY = numpy
+        except ImportError:
+            _NUMPY = False
+    return _NUMPY or None
+
+
+def compact_array(values: ConfigValue) -> ConfigValue:
+    if type(values) is not list or len(values) < COMPACT_MIN_LENGTH:
+        return values
+    types = set(map(type, values))
+    if len(types) != 1:
+        return values
+    typecode = _TYPECODES.get(types.pop())
+    if typecode is None:
+        return values
+    numpy = _numpy()
+    try:
+        if numpy is not None:
+            compact = numpy.array(values, dtype=numpy.int64 if typecode == 'q' else numpy.float64)
+            compact.flags.writeable = False
+            return compact
+        return memoryview(array(typecode, values)).toreadonly()
+    except OverflowError:
+        return values
+
+
+def is_compact(value: ConfigValue) -> bool:
+    return isinstance(value, memoryview) or (bool(_NUMPY) and isinstance(value, _NUMPY.ndarray))
+
+
+def as_list(value: ConfigValue) -> ConfigValue:
+    return value.tolist() if is_compact(value) else value
+
+
+def copy_configs(configs: ConfigDict, compact_arrays: bool = False) -> ConfigDict:
+    # Deep copy, but share the read-only compact arrays, and optionally compact lists on the way.
+    memo = {}
+    for value in configs.values():
+        if is_compact(value):
+            memo[id(value)] = value
+        elif compact_arrays and type(value) is list:
+            compact = compact_array(value)
+            if compact is not value:
+                memo[id(value)] = compact
+    return deepcopy(configs if type(configs) is dict else dict(configs.items()), memo)
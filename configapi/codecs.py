@@ -0,0 +1,164 @@
+from pathlib import PurePath
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, Union
+
+from .types import TOMLDict, TOMLValue
+from .toml import parse_toml, format_toml
+
+
+LoadsType = Callable[[str], TOMLDict]
+DumpsType = Callable[[TOMLDict], str]
+
+_ORJSON = None
+
+
+class Codec(object):
+    # Converts between file contents and nested dicts; flattening into dotted keys is shared by all codecs.
+    __slots__ = ('_name', '_loads', '_dumps')
+
+    def __init__(self, name: str, loads: LoadsType, dumps: DumpsType) -> None:
+        self._name: str = name
+        self._loads: LoadsType = loads
+        self._dumps: DumpsType = dumps
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    def loads(self, text: str) -> TOMLDict:
+        if len(text.strip()) == 0:
+            return {}
+        nested = self._loads(text)
+        if not isinstance(nested, dict):
+            raise ValueError(f"The top level of a {self._name.upper()} config file must be a mapping, "
+                             f"not {type(nested).__name__}.")
+        null = _find_null(nested)
+        if null is not None:
+            # Like TOML, configs have no null value; it could neither be saved nor dumped.
+            raise ValueError(f"{self._name.upper()} config files cannot hold null values: '{null}'.")
+        return nested
+
+    def dumps(self, nested: TOMLDict) -> str:
+        return self._dumps(nested)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._name!r})"
+
+
+def _find_null(nested: TOMLDict) -> Optional[str]:
+    stack = [('', nested)]
+    while stack:
+        (path, value) = stack.pop()
+        if value is None:
+            return path
+        if isinstance(value, dict):
+            stack.extend((f'{path}.{k}' if path else str(k), v) for (k, v) in value.items())
+        elif isinstance(value, list):
+            stack.extend((f'{path}[{i}]', v) for (i, v) in enumerate(value))
+    return None
+
+
+def _orjson() -> Any:
+    # orjson is optional and much faster than the standard library for large machine-generated files.
+    global _ORJSON
+    if _ORJSON is None:
+        try:
+            import orjson
+            _ORJSON = orjson
+        except ImportError:
+            _ORJSON = False
+    return _ORJSON or None
+
+
+def _json_loads(text: str) -> TOMLDict:
+    orjson = _orjson()
+    if orjson is not None:
+        return orjson.loads(text)
+    from json import loads
+    return loads(text)
+
+
+def _json_dumps(nested: TOMLDict) -> str:
+    from .dump import _json_default
+    orjson = _orjson()
+    if orjson is not None:
+        return orjson.dumps(nested, default=_json_default, option=orjson.OPT_INDENT_2).decode() + '\n'
+    from json import dumps
+    return dumps(nested, default=_json_default, indent=2, ensure_ascii=False) + '\n'
+
+
+def _ini_parser() -> Any:
+    from configparser import ConfigParser
+    parser = ConfigParser(interpolation=None, default_section='\0')
+    parser.optionxform = str  # Keys are case-sensitive like everywhere else.
+    return parser
+
+
+def _ini_loads(text: str) -> TOMLDict:
+    # Section names may be dotted; values are kept as strings, typed access is left to schemas.
+    parser = _ini_parser()
+    parser.read_string(text)
+    return {section: dict(parser.items(section)) for section in parser.sections()}
+
+
+def _ini_sections(nested: TOMLDict, base: str) -> Iterator[Tuple[str, Dict[str, TOMLValue]]]:
+    options = {key: value for (key, value) in nested.items() if not isinstance(value, dict)}
+    if len(options) > 0:
+        if len(base) == 0:
+            raise ValueError(f"INI files cannot hold top-level keys: {', '.join(options)}.")
+        yield base, options
+    for (key, value) in nested.items():
+        if isinstance(value, dict):
+            yield from _ini_sections(value, f'{base}.{key}' if len(base) > 0 else key)
+
+
+def _ini_value(value: TOMLValue) -> str:
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (str, int, float)):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not INI serializable.")
+
+
+def _ini_dumps(nested: TOMLDict) -> str:
+    from io import StringIO
+    parser = _ini_parser()
+    for (section, options) in _ini_sections(nested, ''):
+        parser[section] = {key: _ini_value(value) for (key, value) in options.items()}
+    out = StringIO()
+    parser.write(out)
+    return out.getvalue()
+
+
+def _yaml_loads(text: str) -> TOMLDict:
+    from yaml import safe_load  # Optional dependency, only needed for YAML files.
+    return safe_load(text) or {}
+
+
+def _yaml_dumps(nested: TOMLDict) -> str:
+    from yaml import safe_dump
+    return safe_dump(nested, sort_keys=False, allow_unicode=True)
+
+
+TOML = Codec('toml', parse_toml, format_toml)
+JSON = Codec('json', _json_loads, _json_dumps)
+INI = Codec('ini', _ini_loads, _ini_dumps)
+YAML = Codec('yaml', _yaml_loads, _yaml_dumps)
+
+CODECS: Dict[str, Codec] = {
+    '.toml': TOML,
+    '.json': JSON,
+    '.ini': INI,
+    '.cfg': INI,
+    '.yaml': YAML,
+    '.yml': YAML,
+}
+
+
+def register_codec(extension: str, codec: Codec) -> None:
+    if not extension.startswith('.'):
+        extension = '.' + extension
+    CODECS[extension.lower()] = codec
+
+
+def find_codec(file: Union[str, PurePath]) -> Optional[Codec]:
+    return CODECS.get(PurePath(file).suffix.lower())
@@ -1,28 +1,104 @@
-from typing import Callable, Dict, List, Set
+from contextlib import contextmanager
+from functools import wraps
+from operator import itemgetter
+from contextvars import ContextVar
+from typing import (
+    Any, Callable, Dict, Iterable, List, Tuple, Type, TypeVar, Iterator, Mapping, Optional, TextIO, KeysView)
 
 
-from .types import KeyType, ConfigValue
+from .types import KeyType, ConfigValue, ConfigDict
 from .patcher import Patcher, PatchType
 from .scope import Scope, SourceType
+from .diff import ConfigDiff, ChangeType, MISSING, values_equal
+from .interpolation import Interpolator
+from .schema import Schema, bind
+from .dump import DUMPERS
+
+
+SubscriberType = Callable[[ConfigDiff], None]
+CachedType = TypeVar('CachedType', bound=Callable)
+LayerType = Tuple[Optional[str], Mapping, Optional[Scope]]
+EntryType = Tuple[KeyType, ConfigValue, Optional[str], Optional[Scope]]
+
+_ABSENT = object()
+_FIELDS: Dict[Tuple[bool, bool], Callable[[EntryType], tuple]] = {
+    (False, False): itemgetter(0, 1),
+    (True, False): itemgetter(0, 1, 2),
+    (False, True): itemgetter(0, 1, 3),
+    (True, True): itemgetter(0, 1, 2, 3),
+}
 
 
 class Configs(object):
-    __slots__ = ('_patcher', '_scopes', '_priority')
+    __slots__ = ('_patcher', '_scopes', '_priority', '_subscriptions', '_loading', '_interpolator', '_overrides',
+                 '_schema', '_generation', '_winners', '_view', '_entries')
 
-    def __init__(self, /, sources: Dict[str, SourceType] = None, *, target_version: str = None) -> None:
+    def __init__(self, /, sources: Dict[str, SourceType] = None, *,
+                 target_version: str = None,
+                 interpolate: bool = False,
+                 schema: Schema = None,
+                 ) -> None:
         self._patcher: Patcher = Patcher(target_version=target_version)
         self._scopes: Dict[str, Scope] = {}
         self._priority: List[str] = []
+        self._subscriptions: Dict[KeyType, List[SubscriberType]] = {}
+        self._loading: bool = False
+        self._interpolator: Interpolator = Interpolator(self._raw_get) if interpolate else None
+        self._overrides: ContextVar = ContextVar(f'overrides_{id(self):x}', default=())
+        self._schema: Schema = schema
+        self._generation: int = 0
+        self._winners: Optional[Dict[KeyType, str]] = None
+        self._view: Optional[Tuple[int, ConfigDict]] = None
+        self._entries: Optional[Tuple[int, Tuple[EntryType, ...]]] = None
         if isinstance(sources, dict):
             for (name, source) in sources.items():
                 self.add_source(name, source)
 
     def add_source(self, /, name: str, source: SourceType, **kwargs) -> Scope:
+        return self.insert_source(name, source, **kwargs)
+
+    def insert_source(self, /, name: str, source: SourceType, *,
+                      before: str = None,
+                      after: str = None,
+                      **kwargs) -> Scope:
+        if name in self._scopes:
+            raise ValueError(f"Scope '{name}' already exists.")
+        position = self._position(before, after)
+        kwargs.setdefault('schema', self._schema)
         scope = Scope(source, self._patcher, **kwargs)
         self._scopes[name] = scope
-        self._priority.append(name)
+        self._priority.insert(position, name)
+        scope.add_listener(self._scope_changed)
+        self._generation += 1
+        return scope
+
+    def remove_source(self, name: str, /) -> Scope:
+        scope = self._scopes[name]
+
+        def _remove() -> None:
+            del self._scopes[name]
+            self._priority.remove(name)
+
+        self._reprioritize(scope, _remove)
+        scope.remove_listener(self._scope_changed)
         return scope
 
+    def move_source(self, name: str, /, *, before: str = None, after: str = None) -> None:
+        scope = self._scopes[name]
+        self._position(before, after)  # Validates the anchors before anything is changed.
+        if name in (before, after):
+            return
+
+        def _move() -> None:
+            self._priority.remove(name)
+            self._priority.insert(self._position(before, after), name)
+
+        self._reprioritize(scope, _move)
+
+    @property
+    def priority(self) -> Tuple[str, ...]:
+        return tuple(self._priority)
+
     def scope(self, name: str) -> Scope:
         return self._scopes[name]
 
@@ -39,51 +115,372 @@ class Configs(object):
 
         return _decorator
 
+    def subscribe(self, key: KeyType, callback: SubscriberType = None, /):
+        def _decorator(callback: SubscriberType) -> SubscriberType:
+            self._subscriptions.setdefault(key, []).append(callback)
+            return callback
+
+        return _decorator if callback is None else _decorator(callback)
+
+    def unsubscribe(self, key: KeyType, callback: SubscriberType, /) -> None:
+        callbacks = self._subscriptions[key]
+        callbacks.remove(callback)
+        if len(callbacks) == 0:
+            del self._subscriptions[key]
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    @property
+    def schema(self) -> Schema:
+        return self._schema
+
+    @property
+    def interpolate(self) -> bool:
+        return self._interpolator is not None
+
+    @property
+    def caches(self) -> Dict[str, Any]:
+        # The derived lookup structures currently held, for inspection only.
+        caches = {'winners': self._winners,
+                  'view': self._view[1] if self._view is not None else None,
+                  'entries': self._entries[1] if self._entries is not None else None}
+        return {name: cache for (name, cache) in caches.items() if cache is not None}
+
     def load(self) -> None:
-        for scope in self._scopes.values():
-            scope.load()
+        self._winners = None
+        if not self._tracking:
+            for scope in self._scopes.values():
+                scope.load()
+        else:
+            previous = self._merged()
+            self._loading = True
+            try:
+                for scope in self._scopes.values():
+                    scope.load()
+            finally:
+                self._loading = False
+            self._changed(ConfigDiff(previous, self._merged()))
+        if self._schema is not None:
+            self._schema.check_required(self)
 
-    def keys(self) -> Set[str]:
-        for key, _ in self.items():
-            yield key
+    def cached(self, keys: Iterable[KeyType]) -> Callable[[CachedType], CachedType]:
+        keys = tuple(keys)
 
-    def items(self, source=False, scope=False):
-        processed = set()
-        for name in reversed(self._priority):
-            s = self._scopes[name]
-            for (key, value) in s.items():
-                if key in processed:
-                    continue
-                result = [key, value]
-                if source:
-                    result.append(name)
-                if scope:
-                    result.append(s)
-                yield tuple(result)
-                processed.add(key)
-
-    def values(self):
-        for _, value in self.items():
-            yield value
+        def _decorator(func: CachedType) -> CachedType:
+            entries: Dict[Any, Tuple[int, Tuple[ConfigDict, ...], List[ConfigValue], Any]] = {}
+
+            @wraps(func)
+            def _cached(*args, **kwargs):
+                (generation, overlays) = (self._generation, self._overrides.get())
+                key = (args, tuple(sorted(kwargs.items()))) if kwargs else args
+                entry = entries.get(key)
+                if entry is not None and entry[0] == generation and entry[1] is overlays:
+                    return entry[3]
+                # Something changed, but the result can be reused if none of its keys did.
+                values = list(self.get_many(keys, default=_ABSENT).values())
+                if entry is not None and all(values_equal(a, b) for (a, b) in zip(values, entry[2])):
+                    result = entry[3]
+                else:
+                    result = func(*args, **kwargs)
+                entries[key] = (generation, overlays, values, result)
+                return result
+
+            _cached.cache_clear = entries.clear
+            return _cached
+
+        return _decorator
+
+    def bind(self, datacls: Type, /, prefix: str = '') -> Any:
+        return bind(datacls, lambda key: self.get(key) if key in self else MISSING, prefix)
+
+    @contextmanager
+    def override(self, configs: ConfigDict, /) -> Iterator['Configs']:
+        token = self._overrides.set((dict(configs),) + self._overrides.get())
+        try:
+            yield self
+        finally:
+            self._overrides.reset(token)
+
+    def items(self, source=False, scope=False) -> Iterable[tuple]:
+        overlays = self._overrides.get()
+        if overlays or self._interpolator is not None:
+            return map(_FIELDS[(bool(source), bool(scope))], self._scan(overlays))
+        if not source and not scope:
+            return self._merged_view().items()
+        return map(_FIELDS[(bool(source), bool(scope))], self._merged_entries())
+
+    def keys(self) -> KeysView:
+        # Interpolation only affects values, so the cached view serves the keys.
+        overlays = self._overrides.get()
+        if overlays:
+            return dict.fromkeys(entry[0] for entry in self._scan(overlays, resolve=False)).keys()
+        return self._merged_view().keys()
+
+    def values(self) -> Iterable[ConfigValue]:
+        overlays = self._overrides.get()
+        if overlays or self._interpolator is not None:
+            return map(itemgetter(1), self._scan(overlays))
+        return self._merged_view().values()
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def __iter__(self) -> Iterator[KeyType]:
+        return iter(self.keys())
 
     def get(self, key: KeyType, source=False, scope=False) -> ConfigValue:
-        for src in reversed(self._priority):
-            scp = self._scopes[src]
-            if key in scp:
-                result = [scp[key]]
-                if source:
-                    result.append(src)
-                if scope:
-                    result.append(scp)
-                return tuple(result) if len(result) > 1 else result[0]
-        raise KeyError(key)
+        overlays = self._overrides.get()
+        found = self._find(key, overlays)
+        if found is None:
+            raise KeyError(key)
+        (src, layer, scp) = found
+        result = [layer[key] if self._interpolator is None else self._resolve(key, overlays)]
+        if source:
+            result.append(src)
+        if scope:
+            result.append(scp)
+        return tuple(result) if len(result) > 1 else result[0]
+
+    def get_many(self, keys: Iterable[KeyType], default: ConfigValue = MISSING, source=False) -> Dict[KeyType, Any]:
+        results = dict.fromkeys(keys, MISSING)
+        pending = set(results)
+        overlays = self._overrides.get()
+        for (name, layer, _) in self._layers(overlays):
+            if not pending:
+                break
+            found = layer.keys() & pending
+            for key in found:
+                value = layer[key] if self._interpolator is None else self._resolve(key, overlays)
+                results[key] = (value, name) if source else value
+            pending -= found
+        for key in pending:
+            if default is MISSING:
+                raise KeyError(key)
+            results[key] = (default, None) if source else default
+        return results
 
     def __getitem__(self, key: KeyType) -> ConfigValue:
         return self.get(key)
 
     def __contains__(self, key: KeyType) -> bool:
-        return any(key in scope for scope in self._scopes.values())
+        return self._find(key, self._overrides.get()) is not None
+
+    def dump(self, fp: TextIO, /, format: str = 'toml', sources: bool = False) -> None:
+        if format not in DUMPERS:
+            raise ValueError(f"Unsupported format '{format}'.")
+        # Streams from the cached merged view; only a sorted list of its keys is added.
+        overlays = self._overrides.get()
+        if overlays or self._interpolator is not None:
+            (configs, names) = ({}, {})
+            for (key, value, name, _) in self._scan(overlays):
+                (configs[key], names[key]) = (value, name)
+        else:
+            configs = self._merged_view()
+            names = self._winners
+            if sources and names is None:
+                names = dict(map(itemgetter(0, 2), self._scan((), resolve=False)))
+        DUMPERS[format](configs, fp, sources=names if sources else None)
 
     def source(self, key: KeyType) -> str:
         _, source = self.get(key, source=True)
         return source
+
+    @property
+    def _tracking(self) -> bool:
+        return bool(self._subscriptions) or (self._interpolator is not None and len(self._interpolator) > 0)
+
+    def _layers(self, overlays: Tuple[ConfigDict, ...]) -> Iterator[LayerType]:
+        for overlay in overlays:
+            yield (None, overlay, None)
+        for name in reversed(self._priority):
+            scope = self._scopes[name]
+            yield (name, scope, scope)
+        if self._schema is not None:
+            yield (None, self._schema.defaults, None)
+
+    def _scan(self, overlays: Tuple[ConfigDict, ...], resolve: bool = True) -> Iterator[EntryType]:
+        processed = {}
+        generation = self._generation
+        resolve = resolve and self._interpolator is not None
+        for (name, layer, s) in self._layers(overlays):
+            for (key, value) in layer.items():
+                if key in processed:
+                    continue
+                processed[key] = name
+                yield (key, self._resolve(key, overlays) if resolve else value, name, s)
+        if not overlays and self._winners is None and self._generation == generation:
+            # A complete pass over the shared view doubles as the build of the winner index.
+            self._winners = {key: name for (key, name) in processed.items() if name is not None}
+
+    def _merged_view(self) -> ConfigDict:
+        # Raw merged values of the shared view, rebuilt from the winner index after any change.
+        # The dict is replaced rather than updated, so views handed out earlier stay consistent.
+        generation = self._generation
+        if self._view is not None and self._view[0] == generation:
+            return self._view[1]
+        if self._winners is None:
+            view = dict(map(itemgetter(0, 1), self._scan((), resolve=False)))
+        else:
+            scopes = self._scopes
+            view = {key: scopes[name][key] for (key, name) in self._winners.items()}
+            if self._schema is not None:
+                for (key, value) in self._schema.defaults.items():
+                    view.setdefault(key, value)
+        self._view = (generation, view)
+        return view
+
+    def _merged_entries(self) -> Tuple[EntryType, ...]:
+        generation = self._generation
+        if self._entries is not None and self._entries[0] == generation:
+            return self._entries[1]
+        view = self._merged_view()
+        if self._winners is None:
+            entries = tuple(self._scan((), resolve=False))
+        else:
+            (winners, scopes) = (self._winners, self._scopes)
+            entries = tuple((key, value, name, scopes[name] if name is not None else None)
+                            for (key, value, name) in ((k, v, winners.get(k)) for (k, v) in view.items()))
+        self._entries = (generation, entries)
+        return entries
+
+    def _find(self, key: KeyType, overlays: Tuple[ConfigDict, ...]) -> Optional[LayerType]:
+        if not overlays and self._winners is not None:
+            name = self._winners.get(key)
+            if name is not None:
+                scope = self._scopes[name]
+                return (name, scope, scope)
+            if self._schema is not None and key in self._schema.defaults:
+                return (None, self._schema.defaults, None)
+            return None
+        for layer in self._layers(overlays):
+            if key in layer[1]:
+                return layer
+        return None
+
+    def _raw_get(self, key: KeyType) -> ConfigValue:
+        found = self._find(key, self._overrides.get())
+        if found is None:
+            raise KeyError(key)
+        return found[1][key]
+
+    def _position(self, before: Optional[str], after: Optional[str]) -> int:
+        if before is not None and after is not None:
+            raise ValueError("Only one of 'before' and 'after' can be given.")
+        for anchor in (before, after):
+            if anchor is not None and anchor not in self._scopes:
+                raise KeyError(anchor)
+        if before is not None:
+            return self._priority.index(before)
+        if after is not None:
+            return self._priority.index(after) + 1
+        return len(self._priority)
+
+    def _winner(self, key: KeyType) -> Optional[str]:
+        if self._winners is not None:
+            return self._winners.get(key)
+        for name in reversed(self._priority):
+            scope = self._scopes[name]
+            if scope.loaded and key in scope:
+                return name
+        return None
+
+    def _effective(self, key: KeyType) -> ConfigValue:
+        name = self._winner(key)
+        if name is not None:
+            return self._scopes[name][key]
+        if self._schema is not None:
+            return self._schema.defaults.get(key, MISSING)
+        return MISSING
+
+    def _reindex(self, keys: Iterable[KeyType]) -> None:
+        winners = self._winners
+        self._winners = None
+        for key in keys:
+            name = self._winner(key)
+            if name is None:
+                winners.pop(key, None)
+            else:
+                winners[key] = name
+        self._winners = winners
+
+    def _reprioritize(self, scope: Scope, update: Callable[[], None]) -> None:
+        # Only the keys held by the moved or removed scope can change their winning scope.
+        keys = list(scope.keys()) if scope.loaded else []
+        previous = {key: self._effective(key) for key in keys} if self._tracking else None
+        update()
+        self._generation += 1
+        if self._winners is not None:
+            self._reindex(keys)
+        if previous is not None:
+            changes = {}
+            for (key, old) in previous.items():
+                new = self._effective(key)
+                if not values_equal(old, new):
+                    changes[key] = (old, new)
+            self._changed(ConfigDiff.from_changes(changes))
+
+    def _resolve(self, key: KeyType, overlays: Tuple[ConfigDict, ...]) -> ConfigValue:
+        # Memoized values are only valid for the shared view; overridden contexts resolve afresh.
+        if overlays:
+            return Interpolator(self._raw_get).resolve(key)
+        return self._interpolator.resolve(key)
+
+    def _merged(self) -> ConfigDict:
+        merged = dict(self._schema.defaults) if self._schema is not None else {}
+        for name in self._priority:
+            scope = self._scopes[name]
+            if scope.loaded:
+                merged.update(scope.items())
+        return merged
+
+    def _scope_changed(self, scope: Scope, diff: ConfigDiff) -> None:
+        self._generation += 1
+        if self._winners is not None:
+            # A reload replaces the whole storage. Computing its diff would parse every pending section
+            # of lazily parsed sources, so the index is dropped and rebuilt by the next full pass.
+            if diff.deferred:
+                self._winners = None
+            else:
+                self._reindex(diff.keys())
+        if self._interpolator is not None:
+            # Memoized values hold the stored objects, so they are dropped even where the change is not effective.
+            if diff.deferred:
+                self._interpolator.clear()
+            else:
+                self._interpolator.invalidate(diff.keys())
+        if self._loading or not self._tracking:
+            return
+        for (name, candidate) in self._scopes.items():
+            if candidate is scope:
+                self._changed(ConfigDiff.from_changes(self._effective_changes(name, diff)))
+
+    def _effective_changes(self, name: str, diff: ConfigDiff) -> Dict[KeyType, ChangeType]:
+        position = self._priority.index(name)
+        higher = [self._scopes[n] for n in self._priority[position + 1:] if self._scopes[n].loaded]
+        lower = [self._scopes[n] for n in reversed(self._priority[:position]) if self._scopes[n].loaded]
+        if self._schema is not None:
+            lower.append(self._schema.defaults)
+        changes = {}
+        for (key, (old, new)) in diff.items():
+            if any(key in s for s in higher):
+                continue
+            if old is MISSING or new is MISSING:
+                fallback = next((s[key] for s in lower if key in s), MISSING)
+                old = fallback if old is MISSING else old
+                new = fallback if new is MISSING else new
+            if not values_equal(old, new):
+                changes[key] = (old, new)
+        return changes
+
+    def _changed(self, diff: ConfigDiff) -> None:
+        if not diff:
+            return
+        if self._interpolator is not None:
+            self._interpolator.invalidate(diff.keys())
+        for (key, callbacks) in list(self._subscriptions.items()):
+            selected = diff.filter(key)
+            if selected:
+                for callback in tuple(callbacks):
+                    callback(selected)
@@ -0,0 +1,123 @@
+from typing import Dict, Tuple, Iterator, KeysView, ItemsView, Mapping
+
+from .types import ConfigDict, ConfigValue, KeyType
+
+
+class _Missing(object):
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return '<missing>'
+
+
+MISSING = _Missing()
+
+ChangeType = Tuple[ConfigValue, ConfigValue]
+
+
+def values_equal(a: ConfigValue, b: ConfigValue) -> bool:
+    if a is b:
+        return True
+    try:
+        return bool(a == b)
+    except ValueError:
+        # Element-wise comparison, e.g. of NumPy arrays.
+        if hasattr(a, 'tolist') and hasattr(b, 'tolist'):
+            return a.tolist() == b.tolist()
+        return False
+
+
+def matches(key: KeyType, pattern: KeyType) -> bool:
+    if pattern == '' or pattern.endswith('.'):
+        return key.startswith(pattern)
+    return key == pattern
+
+
+class ConfigDiff(object):
+    # Changes are stored as key -> (old, new), with MISSING marking an absent side.
+    # When constructed from two dicts, the comparison is deferred until first access.
+    __slots__ = ('_old', '_new', '_changes')
+
+    def __init__(self, old: Mapping = None, new: Mapping = None) -> None:
+        self._old: Mapping = old if old is not None else {}
+        self._new: Mapping = new if new is not None else {}
+        self._changes: Dict[KeyType, ChangeType] = None
+
+    @classmethod
+    def from_changes(cls, changes: Dict[KeyType, ChangeType]) -> 'ConfigDiff':
+        diff = cls()
+        diff._changes = changes
+        return diff
+
+    @property
+    def deferred(self) -> bool:
+        return self._changes is None
+
+    @property
+    def changes(self) -> Dict[KeyType, ChangeType]:
+        if self._changes is None:
+            (old, new) = (self._old, self._new)
+            changes = {}
+            if type(old) is type(new) and hasattr(old, 'changed_items'):
+                # Structurally shared storage only needs to compare the parts that differ.
+                for (key, value, other) in old.changed_items(new):
+                    if value is MISSING or other is MISSING or not values_equal(value, other):
+                        changes[key] = (value, other)
+                (self._changes, self._old, self._new) = (changes, None, None)
+                return changes
+            for (key, value) in old.items():
+                other = new[key] if key in new else MISSING
+                if other is MISSING or not values_equal(value, other):
+                    changes[key] = (value, other)
+            for (key, value) in new.items():
+                if key not in old:
+                    changes[key] = (MISSING, value)
+            self._changes = changes
+            self._old = self._new = None
+        return self._changes
+
+    @property
+    def added(self) -> ConfigDict:
+        return {key: new for (key, (old, new)) in self.changes.items() if old is MISSING}
+
+    @property
+    def removed(self) -> ConfigDict:
+        return {key: old for (key, (old, new)) in self.changes.items() if new is MISSING}
+
+    @property
+    def modified(self) -> Dict[KeyType, ChangeType]:
+        return {key: change for (key, change) in self.changes.items()
+                if change[0] is not MISSING and change[1] is not MISSING}
+
+    def filter(self, pattern: KeyType) -> 'ConfigDiff':
+        return ConfigDiff.from_changes({key: change for (key, change) in self.changes.items()
+                                        if matches(key, pattern)})
+
+    def keys(self) -> KeysView:
+        return self.changes.keys()
+
+    def items(self) -> ItemsView:
+        return self.changes.items()
+
+    def __getitem__(self, key: KeyType) -> ChangeType:
+        return self.changes[key]
+
+    def __contains__(self, key: KeyType) -> bool:
+        return key in self.changes
+
+    def __iter__(self) -> Iterator[KeyType]:
+        return iter(self.changes)
+
+    def __len__(self) -> int:
+        return len(self.changes)
+
+    def __bool__(self) -> bool:
+        return len(self.changes) > 0
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ConfigDiff):
+            return NotImplemented
+        return self.changes == other.changes
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.changes!r})"
@@ -0,0 +1,145 @@
+from datetime import date, datetime, time
+from math import isinf, isnan
+from re import compile as compile_regex
+from typing import Callable, Collection, Dict, Iterable, List, Mapping, Optional, TextIO
+
+from .types import ConfigValue, KeyType
+from .toml import KeyCollisionException
+from .arrays import is_compact
+
+
+_BARE_KEY = compile_regex(r'[A-Za-z0-9_-]+')
+_ESCAPES = {'\b': '\\b', '\t': '\\t', '\n': '\\n', '\f': '\\f', '\r': '\\r', '"': '\\"', '\\': '\\\\'}
+
+
+def _toml_string(value: str) -> str:
+    chars = []
+    for char in value:
+        if char in _ESCAPES:
+            chars.append(_ESCAPES[char])
+        elif char < ' ' or char == '\x7f':
+            chars.append(f'\\u{ord(char):04x}')
+        else:
+            chars.append(char)
+    return '"' + ''.join(chars) + '"'
+
+
+def _toml_key(key: str) -> str:
+    return key if _BARE_KEY.fullmatch(key) else _toml_string(key)
+
+
+def format_toml_value(value: ConfigValue) -> str:
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float):
+        if isnan(value):
+            return 'nan'
+        if isinf(value):
+            return 'inf' if value > 0 else '-inf'
+        return repr(value)
+    if isinstance(value, str):
+        return _toml_string(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, dict):
+        if len(value) == 0:
+            return '{}'
+        return '{ ' + ', '.join(f'{_toml_key(k)} = {format_toml_value(v)}' for (k, v) in value.items()) + ' }'
+    if is_compact(value):
+        # NumPy scalars are neither int nor float subclasses, and their repr is not valid TOML.
+        value = value.tolist()
+    if hasattr(value, '__iter__'):
+        return '[' + ', '.join(format_toml_value(v) for v in value) + ']'
+    raise TypeError(f"Object of type {type(value).__name__} is not TOML serializable.")
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable.")
+
+
+def _check_collisions(parts: List[str], depth: int, keys: Collection[KeyType]) -> None:
+    # A table must not share its name with a value, e.g. 'a' and 'a.b'.
+    for i in range(depth, len(parts)):
+        prefix = '.'.join(parts[:i + 1])
+        if prefix in keys:
+            raise KeyCollisionException(prefix)
+
+
+def _table_order(keys: Iterable[KeyType]) -> List[KeyType]:
+    # Sorting the flat keys and then stably by table keeps each table together, in leaf order.
+    # Only the distinct table names are kept while sorting, and no key is split.
+    ordered = sorted(keys)
+    tables: Dict[str, str] = {}
+
+    def _table(key: KeyType) -> str:
+        table = key[:max(key.rfind('.'), 0)]
+        return tables.setdefault(table, table)
+
+    ordered.sort(key=_table)
+    return ordered
+
+
+def dump_toml(configs: Mapping[KeyType, ConfigValue], fp: TextIO, /,
+              sources: Mapping[KeyType, Optional[str]] = None) -> None:
+    keys = configs.keys()
+    (table, first) = ('', True)
+    for key in _table_order(keys):
+        dot = key.rfind('.')
+        (parent, leaf) = (key[:dot], key[dot + 1:]) if dot >= 0 else ('', key)
+        if parent != table:
+            parts = parent.split('.')
+            _check_collisions(parts, 0, keys)
+            fp.write(('' if first else '\n') + '[' + '.'.join(_toml_key(p) for p in parts) + ']\n')
+            table = parent
+        line = f'{_toml_key(leaf)} = {format_toml_value(configs[key])}'
+        source = sources.get(key) if sources is not None else None
+        if source is not None:
+            line += f'  # {source}'
+        fp.write(line + '\n')
+        first = False
+
+
+def dump_json(configs: Mapping[KeyType, ConfigValue], fp: TextIO, /,
+              sources: Mapping[KeyType, Optional[str]] = None) -> None:
+    # Keys sharing a prefix are adjacent in plain sort order, which is all the nesting needs.
+    from json import dumps
+    keys = configs.keys()
+    path: List[str] = []
+    fp.write('{')
+    first = True
+    for key in sorted(keys):
+        parts = key.split('.')
+        (parent, leaf) = (parts[:-1], parts[-1])
+        common = 0
+        while common < min(len(path), len(parent)) and path[common] == parent[common]:
+            common += 1
+        while len(path) > common:
+            path.pop()
+            fp.write('\n' + '  ' * (len(path) + 1) + '}')
+        _check_collisions(parent, common, keys)
+        for node in parent[common:]:
+            fp.write(('\n' if first else ',\n') + '  ' * (len(path) + 1) + dumps(node) + ': {')
+            path.append(node)
+            first = True
+        value = configs[key]
+        if sources is not None:
+            value = {'value': value, 'source': sources.get(key)}
+        fp.write(('\n' if first else ',\n') + '  ' * (len(path) + 1) + dumps(leaf) + ': '
+                 + dumps(value, default=_json_default))
+        first = False
+    while path:
+        path.pop()
+        fp.write('\n' + '  ' * (len(path) + 1) + '}')
+    fp.write('\n}\n' if len(keys) > 0 else '}\n')
+
+
+DUMPERS: Dict[str, Callable[..., None]] = {
+    'toml': dump_toml,
+    'json': dump_json,
+}
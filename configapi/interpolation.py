@@ -0,0 +1,88 @@
+from re import compile as compile_regex
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+
+from .types import ConfigValue, KeyType
+
+
+_REFERENCE = compile_regex(r'\$(?:\$|\{([^}]+)\})')
+
+
+class InterpolationCycleException(Exception):
+
+    def __init__(self, cycle: List[KeyType], /) -> None:
+        self._cycle: List[KeyType] = cycle
+        super().__init__(f"Cyclic reference: {' -> '.join(cycle)}.")
+
+    @property
+    def cycle(self) -> List[KeyType]:
+        return self._cycle
+
+
+class Interpolator(object):
+    # Resolves ${other.key} references. Resolved values are memoized and the reverse
+    # dependency graph is used to invalidate only the keys depending on a changed key.
+    __slots__ = ('_lookup', '_resolved', '_dependents')
+
+    def __init__(self, lookup: Callable[[KeyType], ConfigValue]) -> None:
+        self._lookup: Callable[[KeyType], ConfigValue] = lookup
+        self._resolved: Dict[KeyType, ConfigValue] = {}
+        self._dependents: Dict[KeyType, Set[KeyType]] = {}
+
+    def resolve(self, key: KeyType) -> ConfigValue:
+        return self._resolve(key, [])
+
+    def _resolve(self, key: KeyType, resolving: List[KeyType]) -> ConfigValue:
+        # The stack of keys being resolved belongs to this call, as the memo is shared between threads.
+        try:
+            return self._resolved[key]
+        except KeyError:
+            pass
+        if key in resolving:
+            raise InterpolationCycleException(resolving[resolving.index(key):] + [key])
+        raw = self._lookup(key)
+        resolving.append(key)
+        try:
+            (value, references) = self._expand(raw, resolving)
+        finally:
+            resolving.pop()
+        for reference in references:
+            self._dependents.setdefault(reference, set()).add(key)
+        self._resolved[key] = value
+        return value
+
+    def invalidate(self, keys: Iterable[KeyType]) -> Set[KeyType]:
+        invalidated = set()
+        pending = list(keys)
+        while pending:
+            key = pending.pop()
+            if key in invalidated:
+                continue
+            invalidated.add(key)
+            self._resolved.pop(key, None)
+            pending.extend(self._dependents.pop(key, ()))
+        return invalidated
+
+    def clear(self) -> None:
+        self._resolved.clear()
+        self._dependents.clear()
+
+    def __len__(self) -> int:
+        return len(self._resolved)
+
+    def _expand(self, value: ConfigValue, resolving: List[KeyType]) -> Tuple[ConfigValue, List[KeyType]]:
+        if not isinstance(value, str) or '$' not in value:
+            return value, []
+        match = _REFERENCE.fullmatch(value)
+        if match is not None and match.group(1) is not None:
+            reference = match.group(1)
+            return self._resolve(reference, resolving), [reference]
+        references = []
+
+        def _substitute(match) -> str:
+            reference = match.group(1)
+            if reference is None:
+                return '$'
+            references.append(reference)
+            return str(self._resolve(reference, resolving))
+
+        return _REFERENCE.sub(_substitute, value), references
@@ -0,0 +1,172 @@
+from collections.abc import MutableMapping
+from re import compile as compile_regex, DOTALL
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, KeysView, ItemsView, ValuesView
+
+from .types import ConfigDict, ConfigValue, KeyType
+from .toml import parse_toml, flat_dict
+
+
+SectionsType = Dict[str, List[Tuple[int, int]]]
+LoaderType = Callable[[], ConfigDict]
+
+ROOT = ''
+
+_TOKEN = compile_regex(r'"""|\'\'\'|["\'#\[\]{}\n]')
+_BASIC_STRING_END = compile_regex(r'(?:[^"\\\n]|\\.)*"')
+_MULTILINE_BASIC_STRING_END = compile_regex(r'(?:[^\\"]|\\.|"(?!""))*""""{0,2}', DOTALL)
+_KEY_PART = r'(?:[A-Za-z0-9_-]+|"(?:[^"\\\n]|\\.)*"|\'[^\'\n]*\')'
+_HEADER = compile_regex(r'\[\[?[ \t]*(' + _KEY_PART + r')(?:[ \t]*\.[ \t]*' + _KEY_PART + r')*[ \t]*\]\]?')
+
+
+def _top_level_name(part: str) -> Optional[str]:
+    if part.startswith('"'):
+        if '\\' in part:
+            return None
+        part = part[1:-1]
+    elif part.startswith("'"):
+        part = part[1:-1]
+    return part.split('.', 1)[0] or None
+
+
+def scan_toml_sections(text: str) -> Optional[SectionsType]:
+    # Split a TOML document into regions per top-level name, by locating the table headers
+    # outside of strings, comments and multi-line values. Returns None if unsupported.
+    headers: List[Tuple[int, str]] = []
+    (pos, line_start, depth) = (0, 0, 0)
+    while True:
+        match = _TOKEN.search(text, pos)
+        if match is None:
+            break
+        (token, pos) = (match.group(), match.end())
+        if token == '\n':
+            line_start = pos
+        elif token == '#':
+            end = text.find('\n', pos)
+            pos = len(text) if end < 0 else end
+        elif token == '"':
+            end = _BASIC_STRING_END.match(text, pos)
+            if end is None:
+                return None
+            pos = end.end()
+        elif token == "'":
+            end = text.find("'", pos)
+            if end < 0:
+                return None
+            pos = end + 1
+        elif token == '"""':
+            end = _MULTILINE_BASIC_STRING_END.match(text, pos)
+            if end is None:
+                return None
+            pos = end.end()
+        elif token == "'''":
+            end = text.find("'''", pos)
+            if end < 0:
+                return None
+            pos = end + 3
+            while text.startswith("'", pos) and pos - end < 5:
+                pos += 1
+        elif token in '[{':
+            if token == '[' and depth == 0 and text[line_start:match.start()].strip() == '':
+                header = _HEADER.match(text, match.start())
+                if header is None:
+                    return None
+                name = _top_level_name(header.group(1))
+                if name is None:
+                    return None
+                headers.append((line_start, name))
+                pos = header.end()
+            else:
+                depth += 1
+        elif depth > 0:
+            depth -= 1
+        else:
+            return None
+    sections: SectionsType = {ROOT: [(0, headers[0][0] if headers else len(text))]}
+    for (i, (start, name)) in enumerate(headers):
+        end = headers[i + 1][0] if i + 1 < len(headers) else len(text)
+        sections.setdefault(name, []).append((start, end))
+    return sections
+
+
+class LazyConfigDict(MutableMapping):
+    # Flat config dict whose top-level sections are only parsed when first accessed.
+    __slots__ = ('_configs', '_pending')
+
+    def __init__(self, configs: ConfigDict = None, pending: Dict[str, LoaderType] = None) -> None:
+        self._configs: ConfigDict = configs if configs is not None else {}
+        self._pending: Dict[str, LoaderType] = pending if pending is not None else {}
+
+    @property
+    def pending(self) -> KeysView:
+        return self._pending.keys()
+
+    def _resolve(self, key: KeyType) -> None:
+        if self._pending:
+            loader = self._pending.pop(key.split('.', 1)[0], None)
+            if loader is not None:
+                self._configs.update(loader())
+
+    def _resolve_all(self) -> None:
+        while self._pending:
+            self._configs.update(self._pending.pop(next(iter(self._pending)))())
+
+    def __getitem__(self, key: KeyType) -> ConfigValue:
+        self._resolve(key)
+        return self._configs[key]
+
+    def __contains__(self, key: KeyType) -> bool:
+        self._resolve(key)
+        return key in self._configs
+
+    def __setitem__(self, key: KeyType, value: ConfigValue) -> None:
+        self._resolve(key)
+        self._configs[key] = value
+
+    def __delitem__(self, key: KeyType) -> None:
+        self._resolve(key)
+        del self._configs[key]
+
+    def get(self, key: KeyType, default: ConfigValue = None) -> ConfigValue:
+        self._resolve(key)
+        return self._configs.get(key, default)
+
+    def __iter__(self) -> Iterator[KeyType]:
+        self._resolve_all()
+        return iter(self._configs)
+
+    def __len__(self) -> int:
+        self._resolve_all()
+        return len(self._configs)
+
+    def items(self) -> ItemsView:
+        self._resolve_all()
+        return self._configs.items()
+
+    def values(self) -> ValuesView:
+        self._resolve_all()
+        return self._configs.values()
+
+    def copy(self) -> 'LazyConfigDict':
+        return LazyConfigDict(dict(self._configs), dict(self._pending))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._configs!r}, pending={sorted(self._pending)!r})"
+
+
+def parse_configs_lazy(toml_str: str, sections: SectionsType = None, compact_arrays: bool = False) -> ConfigDict:
+    if sections is None:
+        sections = scan_toml_sections(toml_str)
+        if sections is None:
+            return flat_dict(parse_toml(toml_str), compact_arrays=compact_arrays)
+
+    def _loader(spans: List[Tuple[int, int]]) -> LoaderType:
+        return lambda: flat_dict(parse_toml(''.join(toml_str[start:end] for (start, end) in spans)),
+                                 compact_arrays=compact_arrays)
+
+    root = _loader(sections[ROOT])()
+    pending = {name: _loader(spans) for (name, spans) in sections.items() if name != ROOT}
+    if any(key.split('.', 1)[0] in pending for key in root):
+        # A root key and a table share a name, e.g. 'a = 1' and '[a.b]'. The sections are valid on
+        # their own, so only parsing the whole document reports the error.
+        return flat_dict(parse_toml(toml_str), compact_arrays=compact_arrays)
+    return LazyConfigDict(root, pending)
@@ -1,26 +1,47 @@
-from typing import Tuple, Dict, Callable, Union
-from packaging.version import Version
+from typing import Tuple, Dict, Callable, Union, TYPE_CHECKING
 
 
 from . import ConfigDict
 
+if TYPE_CHECKING:
+    from packaging.version import Version
+
 
 PatchType = Callable[[ConfigDict], ConfigDict]
 PatcherType = Callable[[ConfigDict], Tuple[ConfigDict, bool]]
 
 
+def __getattr__(name: str):
+    if name == 'Version':
+        from packaging.version import Version
+        return Version
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _version(version: Union[str, 'Version']) -> 'Version':
+    # packaging is only imported once versions are compared, which many programs never do.
+    from packaging.version import Version
+    return version if isinstance(version, Version) else Version(version)
+
+
 class Patcher(object):
 
-    def __init__(self, target_version: Union[str, Version] = None):
-        self._target_version : Version = None if target_version is None else Version(target_version)
-        self._patches : Dict[Version, PatchType] = {}
+    def __init__(self, target_version: Union[str, 'Version'] = None):
+        self._target_version : Union[str, 'Version'] = target_version
+        self._patches : Dict['Version', PatchType] = {}
     
     @property
-    def target_version(self) -> Version:
-        return max(self._patches.keys()) if self._target_version is None else self._target_version
+    def target_version(self) -> 'Version':
+        if self._target_version is None:
+            return max(self._patches.keys())
+        self._target_version = _version(self._target_version)
+        return self._target_version
 
-    def register(self, version: Union[str, Version], patch: PatchType) -> None:
-        version = Version(version)
+    def register(self, version: Union[str, 'Version'], patch: PatchType) -> None:
+        version = _version(version)
+        if self._target_version is not None:
+            # Parsed with the first patch, so a bad target version fails here rather than on the first load.
+            self._target_version = _version(self._target_version)
         if version in self._patches:
             raise ValueError(f"Multiple patches for version {version} registered.")
         self._patches[version] = patch
@@ -29,7 +50,7 @@ class Patcher(object):
         if len(self._patches) == 0:
             return configs, False
         target_version = self.target_version
-        initial = Version(configs['version'] if 'version' in configs else '0.0.0')
+        initial = _version(configs['version'] if 'version' in configs else '0.0.0')
         if initial >= target_version:
             return configs, False
         current = initial
@@ -0,0 +1,282 @@
+from collections.abc import Mapping, MutableMapping
+from typing import Any, Iterable, Iterator, Optional, Tuple, Union
+
+from .types import ConfigValue, KeyType
+from .diff import MISSING
+
+
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+_HASH_BITS = 64
+_HASH_MASK = (1 << _HASH_BITS) - 1
+
+LeafType = Tuple[int, KeyType, ConfigValue]  # (hash, key, value)
+ChangedType = Tuple[KeyType, ConfigValue, ConfigValue]
+_MISSING = object()
+
+
+class _Node(object):
+    __slots__ = ('bitmap', 'entries')
+
+    def __init__(self, bitmap: int, entries: tuple) -> None:
+        self.bitmap: int = bitmap
+        self.entries: tuple = entries
+
+
+class _Collision(object):
+    __slots__ = ('hash', 'entries')
+
+    def __init__(self, hash: int, entries: tuple) -> None:
+        self.hash: int = hash
+        self.entries: tuple = entries  # Leaves with identical hashes.
+
+
+EntryType = Union[LeafType, _Node, _Collision]
+
+_EMPTY = _Node(0, ())
+
+
+def _hash(key: KeyType) -> int:
+    return hash(key) & _HASH_MASK
+
+
+def _index(bitmap: int, bit: int) -> int:
+    return bin(bitmap & (bit - 1)).count('1')
+
+
+def _entry_hash(entry: EntryType) -> int:
+    return entry.hash if isinstance(entry, _Collision) else entry[0]
+
+
+def _join(a: EntryType, b: LeafType, shift: int) -> EntryType:
+    (ha, hb) = (_entry_hash(a), b[0])
+    if ha == hb:
+        entries = a.entries if isinstance(a, _Collision) else (a,)
+        return _Collision(ha, entries + (b,))
+    (ia, ib) = ((ha >> shift) & _MASK, (hb >> shift) & _MASK)
+    if ia == ib:
+        return _Node(1 << ia, (_join(a, b, shift + _BITS),))
+    return _Node((1 << ia) | (1 << ib), (a, b) if ia < ib else (b, a))
+
+
+def _build(leaves: list, shift: int) -> EntryType:
+    if shift >= _HASH_BITS:
+        return _Collision(leaves[0][0], tuple(leaves))
+    buckets = {}
+    for leaf in leaves:
+        buckets.setdefault((leaf[0] >> shift) & _MASK, []).append(leaf)
+    (bitmap, entries) = (0, [])
+    for i in sorted(buckets):
+        bucket = buckets[i]
+        bitmap |= 1 << i
+        entries.append(bucket[0] if len(bucket) == 1 else _build(bucket, shift + _BITS))
+    return _Node(bitmap, tuple(entries))
+
+
+def _get(node: EntryType, key: KeyType, h: int, shift: int) -> Any:
+    while True:
+        if isinstance(node, _Collision):
+            for leaf in node.entries:
+                if leaf[1] == key:
+                    return leaf[2]
+            return _MISSING
+        bit = 1 << ((h >> shift) & _MASK)
+        if not node.bitmap & bit:
+            return _MISSING
+        entry = node.entries[_index(node.bitmap, bit)]
+        if isinstance(entry, tuple):
+            return entry[2] if entry[0] == h and entry[1] == key else _MISSING
+        (node, shift) = (entry, shift + _BITS)
+
+
+def _set(node: EntryType, leaf: LeafType, shift: int) -> Tuple[EntryType, bool]:
+    (h, key, value) = leaf
+    if isinstance(node, _Collision):
+        for (i, other) in enumerate(node.entries):
+            if other[1] == key:
+                if other[2] is value:
+                    return node, False
+                return _Collision(h, node.entries[:i] + (leaf,) + node.entries[i + 1:]), False
+        return _Collision(h, node.entries + (leaf,)), True
+    bit = 1 << ((h >> shift) & _MASK)
+    i = _index(node.bitmap, bit)
+    if not node.bitmap & bit:
+        return _Node(node.bitmap | bit, node.entries[:i] + (leaf,) + node.entries[i:]), True
+    entry = node.entries[i]
+    if isinstance(entry, tuple):
+        if entry[0] == h and entry[1] == key:
+            if entry[2] is value:
+                return node, False
+            (child, added) = (leaf, False)
+        else:
+            (child, added) = (_join(entry, leaf, shift + _BITS), True)
+    elif isinstance(entry, _Collision) and entry.hash != h:
+        (child, added) = (_join(entry, leaf, shift + _BITS), True)
+    else:
+        (child, added) = _set(entry, leaf, shift + _BITS)
+        if child is entry:
+            return node, False
+    return _Node(node.bitmap, node.entries[:i] + (child,) + node.entries[i + 1:]), added
+
+
+def _delete(node: EntryType, key: KeyType, h: int, shift: int) -> Optional[EntryType]:
+    # Returns the node itself if the key is missing, None if the node became empty,
+    # or a single leaf that the parent can inline.
+    if isinstance(node, _Collision):
+        entries = tuple(leaf for leaf in node.entries if leaf[1] != key)
+        if len(entries) == len(node.entries):
+            return node
+        return entries[0] if len(entries) == 1 else _Collision(node.hash, entries)
+    bit = 1 << ((h >> shift) & _MASK)
+    if not node.bitmap & bit:
+        return node
+    i = _index(node.bitmap, bit)
+    entry = node.entries[i]
+    if isinstance(entry, tuple):
+        if entry[0] != h or entry[1] != key:
+            return node
+        child = None
+    else:
+        child = _delete(entry, key, h, shift + _BITS)
+        if child is entry:
+            return node
+    if child is None:
+        entries = node.entries[:i] + node.entries[i + 1:]
+        if len(entries) == 0:
+            return None
+        if shift > 0 and len(entries) == 1 and isinstance(entries[0], tuple):
+            return entries[0]
+        return _Node(node.bitmap & ~bit, entries)
+    if shift > 0 and len(node.entries) == 1 and isinstance(child, tuple):
+        return child
+    return _Node(node.bitmap, node.entries[:i] + (child,) + node.entries[i + 1:])
+
+
+def _leaves(node: EntryType) -> Iterator[LeafType]:
+    for entry in node.entries:
+        if isinstance(entry, tuple):
+            yield entry
+        else:
+            yield from _leaves(entry)
+
+
+def _changed(a: Optional[EntryType], b: Optional[EntryType]) -> Iterator[ChangedType]:
+    # Compares two tries, skipping all subtrees they share.
+    if a is b:
+        return
+    if isinstance(a, _Node) and isinstance(b, _Node):
+        bits = a.bitmap | b.bitmap
+        while bits:
+            bit = bits & -bits
+            bits ^= bit
+            yield from _changed(a.entries[_index(a.bitmap, bit)] if a.bitmap & bit else None,
+                                b.entries[_index(b.bitmap, bit)] if b.bitmap & bit else None)
+        return
+    (old, new) = ({leaf[1]: leaf[2] for leaf in _entry_leaves(a)}, {leaf[1]: leaf[2] for leaf in _entry_leaves(b)})
+    for (key, value) in old.items():
+        other = new.pop(key, MISSING)
+        if other is not value:
+            yield (key, value, other)
+    for (key, value) in new.items():
+        yield (key, MISSING, value)
+
+
+def _entry_leaves(entry: Optional[EntryType]) -> Iterator[LeafType]:
+    if entry is None:
+        return iter(())
+    return iter((entry,)) if isinstance(entry, tuple) else _leaves(entry)
+
+
+class PersistentMap(Mapping):
+    # Immutable hash array mapped trie: updates return a new map sharing all unchanged nodes.
+    __slots__ = ('_root', '_size')
+
+    def __init__(self, items: Union[Mapping, Iterable[Tuple[KeyType, ConfigValue]]] = (), /) -> None:
+        if isinstance(items, PersistentMap):
+            (self._root, self._size) = (items._root, items._size)
+            return
+        items = dict(items)
+        self._root: _Node = _build([(_hash(key), key, value) for (key, value) in items.items()], 0)
+        self._size: int = len(items)
+
+    @classmethod
+    def _create(cls, root: _Node, size: int) -> 'PersistentMap':
+        pmap = cls.__new__(cls)
+        (pmap._root, pmap._size) = (root, size)
+        return pmap
+
+    def set(self, key: KeyType, value: ConfigValue) -> 'PersistentMap':
+        (root, added) = _set(self._root, (_hash(key), key, value), 0)
+        return self if root is self._root else PersistentMap._create(root, self._size + added)
+
+    def delete(self, key: KeyType) -> 'PersistentMap':
+        root = _delete(self._root, key, _hash(key), 0)
+        if root is self._root:
+            raise KeyError(key)
+        return PersistentMap._create(root if root is not None else _EMPTY, self._size - 1)
+
+    def __getitem__(self, key: KeyType) -> ConfigValue:
+        value = _get(self._root, key, _hash(key), 0)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: KeyType) -> bool:
+        return _get(self._root, key, _hash(key), 0) is not _MISSING
+
+    def get(self, key: KeyType, default: ConfigValue = None) -> ConfigValue:
+        value = _get(self._root, key, _hash(key), 0)
+        return default if value is _MISSING else value
+
+    def __iter__(self) -> Iterator[KeyType]:
+        return (leaf[1] for leaf in _leaves(self._root))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def changed_items(self, other: 'PersistentMap') -> Iterator[ChangedType]:
+        return _changed(self._root, other._root)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self)!r})"
+
+
+class PersistentConfigDict(MutableMapping):
+    # Mutable view on a PersistentMap, for O(1) snapshots and copies of scope storage.
+    __slots__ = ('_map',)
+
+    def __init__(self, items: Union[Mapping, Iterable[Tuple[KeyType, ConfigValue]]] = (), /) -> None:
+        self._map: PersistentMap = items if isinstance(items, PersistentMap) else PersistentMap(items)
+
+    def snapshot(self) -> PersistentMap:
+        return self._map
+
+    def copy(self) -> 'PersistentConfigDict':
+        return PersistentConfigDict(self._map)
+
+    def __getitem__(self, key: KeyType) -> ConfigValue:
+        return self._map[key]
+
+    def __contains__(self, key: KeyType) -> bool:
+        return key in self._map
+
+    def get(self, key: KeyType, default: ConfigValue = None) -> ConfigValue:
+        return self._map.get(key, default)
+
+    def __setitem__(self, key: KeyType, value: ConfigValue) -> None:
+        self._map = self._map.set(key, value)
+
+    def __delitem__(self, key: KeyType) -> None:
+        self._map = self._map.delete(key)
+
+    def __iter__(self) -> Iterator[KeyType]:
+        return iter(self._map)
+
+    def __len__(self) -> int:
+        return len(self._map)
+
+    def changed_items(self, other: 'PersistentConfigDict') -> Iterator[ChangedType]:
+        return self._map.changed_items(other._map)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self)!r})"
@@ -0,0 +1,237 @@
+from argparse import ArgumentParser
+from collections.abc import Mapping
+from sys import getsizeof
+from types import FunctionType
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+import tracemalloc
+
+from .types import ConfigValue, KeyType
+from .configs import Configs
+from .scope import Scope
+from .arrays import is_compact
+
+
+class ScopeMemory(NamedTuple):
+    name: str
+    keys: int
+    key_bytes: int
+    value_bytes: int
+    array_bytes: int
+    storage_bytes: int
+    base_bytes: int  # The copy writable scopes keep to merge concurrent changes on save.
+
+    @property
+    def total(self) -> int:
+        return self.key_bytes + self.value_bytes + self.array_bytes + self.storage_bytes + self.base_bytes
+
+
+class Allocations(NamedTuple):
+    phase: str
+    blocks: int  # Net number of memory blocks still allocated afterwards.
+    retained: int
+    peak: int
+
+
+class Duplicate(NamedTuple):
+    value: str
+    copies: int
+    wasted: int
+    keys: Tuple[KeyType, ...]
+
+
+class Report(NamedTuple):
+    scopes: List[ScopeMemory]
+    cache_bytes: int  # The merged view and winner index of the Configs, beyond the shared keys and values.
+    allocations: List[Allocations]
+    duplicates: List[Duplicate]
+
+
+def deep_sizeof(obj: Any, seen: Set[int] = None) -> int:
+    # Objects already in 'seen' are shared and not counted again.
+    seen = set() if seen is None else seen
+    (size, stack) = (0, [obj])
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, memoryview):
+            size += getsizeof(obj) + obj.nbytes
+            continue
+        if is_compact(obj):
+            size += obj.nbytes + (0 if obj.base is not None else getsizeof(obj))
+            continue
+        size += getsizeof(obj)
+        if isinstance(obj, (str, bytes, int, float, bool, type(None))):
+            continue
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif isinstance(obj, FunctionType):
+            # Lazily parsed sections keep their source text alive in closures.
+            stack.extend(cell.cell_contents for cell in obj.__closure__ or ())
+        else:
+            stack.extend(getattr(obj, slot) for cls in type(obj).__mro__
+                         for slot in getattr(cls, '__slots__', ()) if hasattr(obj, slot))
+            if hasattr(obj, '__dict__'):
+                stack.append(obj.__dict__)
+    return size
+
+
+def _is_array(value: ConfigValue) -> bool:
+    return type(value) is list or is_compact(value)
+
+
+def scope_memory(name: str, scope: Scope, seen: Set[int] = None) -> ScopeMemory:
+    seen = set() if seen is None else seen
+    if not scope.loaded:
+        return ScopeMemory(name, 0, 0, 0, 0, 0, 0)
+    (key_bytes, value_bytes, array_bytes) = (0, 0, 0)
+    for (key, value) in scope.items():
+        key_bytes += deep_sizeof(key, seen)
+        if _is_array(value):
+            array_bytes += deep_sizeof(value, seen)
+        else:
+            value_bytes += deep_sizeof(value, seen)
+    # Keys and values are already seen, so only the storage structures themselves remain.
+    storage_bytes = deep_sizeof(scope.storage, seen)
+    base_bytes = deep_sizeof(scope.base, seen) if scope.base is not None else 0
+    return ScopeMemory(name, len(scope.keys()), key_bytes, value_bytes, array_bytes, storage_bytes, base_bytes)
+
+
+def _filtered(snapshot: tracemalloc.Snapshot) -> tracemalloc.Snapshot:
+    # Modules imported on first use (parsers, codecs) are not part of the config's cost.
+    return snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),
+                                   tracemalloc.Filter(False, __file__),
+                                   tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+                                   tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>')))
+
+
+def allocations(phase: str, func: Callable[[], Any]) -> Allocations:
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        before = _filtered(tracemalloc.take_snapshot())
+        if hasattr(tracemalloc, 'reset_peak'):  # Python 3.9+, otherwise the peak since tracing started.
+            tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        result = func()
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+        del result
+        after = _filtered(tracemalloc.take_snapshot())
+    finally:
+        if started:
+            tracemalloc.stop()
+    stats = after.compare_to(before, 'filename')
+    return Allocations(phase,
+                       sum(stat.count_diff for stat in stats),
+                       sum(stat.size_diff for stat in stats),
+                       peak)
+
+
+def _identity(value: ConfigValue) -> Optional[Tuple[type, Any]]:
+    if value is None or isinstance(value, bool):
+        return None
+    if is_compact(value):
+        # Compact arrays are compared by their contents; memoryviews of most formats cannot be hashed.
+        dtype = value.format if isinstance(value, memoryview) else str(value.dtype)
+        return (type(value), (dtype, value.shape, value.tobytes()))
+    try:
+        hash(value)
+        return (type(value), value)
+    except TypeError:
+        return (type(value), repr(value))
+
+
+def duplicates(scopes: Iterable[Tuple[str, Mapping]], min_size: int = 0) -> List[Duplicate]:
+    # Equal values stored as distinct objects, which could be shared instead.
+    groups: Dict[Tuple[type, Any], Dict[int, Tuple[ConfigValue, List[KeyType]]]] = {}
+    for (name, configs) in scopes:
+        for (key, value) in configs.items():
+            identity = _identity(value)
+            if identity is not None:
+                groups.setdefault(identity, {}).setdefault(id(value), (value, []))[1].append(f'{name}:{key}')
+    found = []
+    for objects in groups.values():
+        if len(objects) < 2:
+            continue
+        copies = list(objects.values())
+        wasted = sum(deep_sizeof(value) for (value, _) in copies[1:])
+        if wasted > min_size:
+            keys = tuple(key for (_, keys) in copies for key in keys)
+            found.append(Duplicate(repr(copies[0][0])[:60], len(copies), wasted, keys))
+    found.sort(key=lambda duplicate: -duplicate.wasted)
+    return found
+
+
+def profile(configs: Configs, /, load: bool = True) -> Report:
+    scopes = [(name, configs.scope(name)) for name in configs.priority]
+    phases = []
+    if load:
+        phases.append(allocations('load', configs.load))
+    phases.append(allocations('items', lambda: sum(1 for _ in configs.items())))
+    # Only the serialization step of saving is measured, profiling never writes to the sources.
+    phases.append(allocations('save', lambda: [scope.source.format_dict(scope.storage)
+                                               for (_, scope) in scopes if scope.loaded]))
+    seen: Set[int] = set()
+    memory = [scope_memory(name, scope, seen) for (name, scope) in scopes]
+    cache_bytes = deep_sizeof(tuple(configs.caches.values()), seen)
+    loaded = [(name, scope) for (name, scope) in scopes if scope.loaded]
+    return Report(memory, cache_bytes, phases, duplicates(loaded))
+
+
+def _size(size: int) -> str:
+    for unit in ('B', 'KiB', 'MiB'):
+        if abs(size) < 1024 or unit == 'MiB':
+            return f'{size} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+        size /= 1024
+
+
+def format_report(report: Report, /, limit: int = 10) -> str:
+    lines = [f"{'scope':<24} {'keys':>8} {'key mem':>10} {'values':>10} {'arrays':>10} {'storage':>10} "
+             f"{'base':>10} {'total':>10}"]
+    for s in report.scopes:
+        lines.append(f'{s.name:<24} {s.keys:>8} {_size(s.key_bytes):>10} {_size(s.value_bytes):>10} '
+                     f'{_size(s.array_bytes):>10} {_size(s.storage_bytes):>10} {_size(s.base_bytes):>10} '
+                     f'{_size(s.total):>10}')
+    lines.append(f"{'merged view and index':<24} {'':>8} {'':>10} {'':>10} {'':>10} {_size(report.cache_bytes):>10} "
+                 f"{'':>10} {_size(report.cache_bytes):>10}")
+    lines.append('')
+    lines.append(f"{'phase':<24} {'blocks':>8} {'retained':>10} {'peak':>10}")
+    for a in report.allocations:
+        lines.append(f'{a.phase:<24} {a.blocks:>8} {_size(a.retained):>10} {_size(a.peak):>10}')
+    if report.duplicates:
+        lines.append('')
+        lines.append(f"{'duplicate value':<40} {'copies':>8} {'wasted':>10}")
+        for d in report.duplicates[:limit]:
+            lines.append(f'{d.value:<40} {d.copies:>8} {_size(d.wasted):>10}  {", ".join(d.keys[:3])}')
+    return '\n'.join(lines) + '\n'
+
+
+def main(argv: Sequence[str] = None) -> None:
+    parser = ArgumentParser(prog='python -m configapi.profile',
+                            description='Report memory use and allocations of a set of config sources.')
+    parser.add_argument('files', nargs='+', help='config files, in increasing order of priority')
+    parser.add_argument('--target-version', default=None)
+    parser.add_argument('--lazy', action='store_true', help='parse TOML sections lazily')
+    parser.add_argument('--compact-arrays', action='store_true', help='store numeric arrays compactly')
+    parser.add_argument('--persistent', action='store_true', help='use persistent scope storage')
+    parser.add_argument('--writable', action='store_true',
+                        help='open the files as writable, to include the state kept for saving (nothing is written)')
+    parser.add_argument('--limit', type=int, default=10, help='number of duplicates to list')
+    args = parser.parse_args(argv)
+
+    from .sources import FileConfigSource
+    configs = Configs(target_version=args.target_version)
+    for file in args.files:
+        source = FileConfigSource(file, lazy=args.lazy, compact_arrays=args.compact_arrays,
+                                  read_only=not args.writable)
+        configs.add_source(file, source, persistent=args.persistent, autosave_updates=False)
+    print(format_report(profile(configs), limit=args.limit), end='')
+
+
+if __name__ == '__main__':
+    main()
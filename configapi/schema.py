@@ -0,0 +1,262 @@
+from typing import Any, Callable, Collection, Dict, Type, Union, get_args, get_origin, get_type_hints
+
+from .types import ConfigDict, ConfigValue, KeyType
+from .diff import MISSING
+from .arrays import is_compact
+
+
+CheckType = Callable[[ConfigValue], ConfigValue]
+
+_FIELD_OPTIONS = ('minimum', 'maximum', 'choices')
+_BOOLEANS = {'true': True, 'yes': True, 'on': True, '1': True,
+             'false': False, 'no': False, 'off': False, '0': False}
+
+
+class ValidationException(Exception):
+
+    def __init__(self, errors: Dict[KeyType, str], /) -> None:
+        self._errors: Dict[KeyType, str] = errors
+        super().__init__('Invalid configs: ' + '; '.join(f"'{key}' {error}" for (key, error) in errors.items()))
+
+    @property
+    def errors(self) -> Dict[KeyType, str]:
+        return self._errors
+
+
+def _to_bool(value: ConfigValue) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.lower() in _BOOLEANS:
+        return _BOOLEANS[value.lower()]
+    raise ValueError(f"is not a boolean: {value!r}")
+
+
+def _to_int(value: ConfigValue) -> int:
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            pass
+    raise ValueError(f"is not an integer: {value!r}")
+
+
+def _to_float(value: ConfigValue) -> float:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    raise ValueError(f"is not a float: {value!r}")
+
+
+def _to_str(value: ConfigValue) -> str:
+    if isinstance(value, str):
+        return value
+    raise ValueError(f"is not a string: {value!r}")
+
+
+_CONVERTERS: Dict[type, CheckType] = {bool: _to_bool, int: _to_int, float: _to_float, str: _to_str}
+_CONTAINERS = (list, tuple, dict, set, frozenset)
+
+
+def _converter(value_type: type) -> CheckType:
+    if get_origin(value_type) is Union:
+        options = [arg for arg in get_args(value_type) if arg is not type(None)]
+        value_type = options[0] if len(options) == 1 else object
+    value_type = get_origin(value_type) or value_type
+    if value_type is object or value_type is Any:
+        return lambda value: value
+    if value_type in _CONVERTERS:
+        return _CONVERTERS[value_type]
+
+    def _convert(value: ConfigValue) -> ConfigValue:
+        if isinstance(value, value_type) or (value_type is list and is_compact(value)):
+            return value
+        if issubclass(value_type, _CONTAINERS):
+            # Constructing a container would split strings and tables instead of rejecting them.
+            raise ValueError(f"is not of type {value_type.__name__}: {value!r}")
+        try:
+            return value_type(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"is not of type {value_type.__name__}: {value!r}")
+
+    return _convert
+
+
+class Field(object):
+    __slots__ = ('_type', '_default', '_minimum', '_maximum', '_choices')
+
+    def __init__(self, type: type = None, /, *,
+                 default: ConfigValue = MISSING,
+                 minimum: Any = None,
+                 maximum: Any = None,
+                 choices: Collection[ConfigValue] = None,
+                 ) -> None:
+        self._type: type = type
+        self._default: ConfigValue = default
+        self._minimum: Any = minimum
+        self._maximum: Any = maximum
+        self._choices: Collection[ConfigValue] = choices
+
+    @property
+    def type(self) -> type:
+        return self._type
+
+    @property
+    def default(self) -> ConfigValue:
+        return self._default
+
+    @property
+    def required(self) -> bool:
+        return self._default is MISSING
+
+    @property
+    def minimum(self) -> Any:
+        return self._minimum
+
+    @property
+    def maximum(self) -> Any:
+        return self._maximum
+
+    @property
+    def choices(self) -> Collection[ConfigValue]:
+        return self._choices
+
+    def compile(self) -> CheckType:
+        steps = []
+        if self._type is not None:
+            steps.append(_converter(self._type))
+        (minimum, maximum, choices) = (self._minimum, self._maximum, self._choices)
+        if minimum is not None or maximum is not None:
+            def _range(value: ConfigValue) -> ConfigValue:
+                try:
+                    if minimum is not None and value < minimum:
+                        raise ValueError(f"is smaller than {minimum!r}: {value!r}")
+                    if maximum is not None and value > maximum:
+                        raise ValueError(f"is larger than {maximum!r}: {value!r}")
+                except TypeError:
+                    raise ValueError(f"is not comparable to the allowed range: {value!r}")
+                return value
+            steps.append(_range)
+        if choices is not None:
+            def _choice(value: ConfigValue) -> ConfigValue:
+                if value not in choices:
+                    raise ValueError(f"is not one of {list(choices)!r}: {value!r}")
+                return value
+            steps.append(_choice)
+        if len(steps) == 1:
+            return steps[0]
+
+        def _check(value: ConfigValue) -> ConfigValue:
+            for step in steps:
+                value = step(value)
+            return value
+
+        return _check
+
+
+class Schema(object):
+    __slots__ = ('_fields', '_checks', '_defaults')
+
+    def __init__(self, fields: Dict[KeyType, Union[Field, type]] = None, /) -> None:
+        self._fields: Dict[KeyType, Field] = {}
+        self._checks: Dict[KeyType, CheckType] = {}
+        self._defaults: ConfigDict = {}
+        errors = {}
+        for (key, field) in (fields or {}).items():
+            if not isinstance(field, Field):
+                field = Field(field)
+            self._fields[key] = field
+            self._checks[key] = check = field.compile()
+            if not field.required:
+                try:
+                    self._defaults[key] = check(field.default)
+                except ValueError as exc:
+                    errors[key] = str(exc)
+        if errors:
+            raise ValidationException(errors)
+
+    @classmethod
+    def from_dataclass(cls, datacls: Type, /, prefix: str = '') -> 'Schema':
+        return cls(_dataclass_fields(datacls, prefix))
+
+    @property
+    def fields(self) -> Dict[KeyType, Field]:
+        return self._fields
+
+    @property
+    def defaults(self) -> ConfigDict:
+        return self._defaults
+
+    def validate(self, configs: ConfigDict) -> ConfigDict:
+        errors = {}
+        for (key, check) in self._checks.items():
+            if key in configs:
+                try:
+                    configs[key] = check(configs[key])
+                except ValueError as exc:
+                    errors[key] = str(exc)
+        if errors:
+            raise ValidationException(errors)
+        return configs
+
+    def validate_value(self, key: KeyType, value: ConfigValue) -> ConfigValue:
+        check = self._checks.get(key)
+        if check is None:
+            return value
+        try:
+            return check(value)
+        except ValueError as exc:
+            raise ValidationException({key: str(exc)})
+
+    def check_required(self, configs) -> None:
+        missing = {key: 'is required' for (key, field) in self._fields.items()
+                   if field.required and key not in configs}
+        if missing:
+            raise ValidationException(missing)
+
+    def __contains__(self, key: KeyType) -> bool:
+        return key in self._fields
+
+
+def _dataclass_fields(datacls: Type, prefix: str) -> Dict[KeyType, Field]:
+    from dataclasses import fields as dataclass_fields, is_dataclass, MISSING as NO_DEFAULT
+    fields = {}
+    hints = get_type_hints(datacls)
+    for field in dataclass_fields(datacls):
+        key = f"{prefix}.{field.name}" if prefix else field.name
+        field_type = hints.get(field.name, field.type)
+        if is_dataclass(field_type):
+            fields.update(_dataclass_fields(field_type, key))
+            continue
+        if field.default is not NO_DEFAULT:
+            default = field.default
+        elif field.default_factory is not NO_DEFAULT:
+            default = field.default_factory()
+        else:
+            default = MISSING
+        options = {option: field.metadata[option] for option in _FIELD_OPTIONS if option in field.metadata}
+        fields[key] = Field(field_type, default=default, **options)
+    return fields
+
+
+def bind(datacls: Type, lookup: Callable[[KeyType], ConfigValue], /, prefix: str = '') -> Any:
+    from dataclasses import fields as dataclass_fields, is_dataclass
+    values = {}
+    hints = get_type_hints(datacls)
+    for field in dataclass_fields(datacls):
+        key = f"{prefix}.{field.name}" if prefix else field.name
+        field_type = hints.get(field.name, field.type)
+        if is_dataclass(field_type):
+            values[field.name] = bind(field_type, lookup, key)
+            continue
+        value = lookup(key)
+        if value is not MISSING:
+            values[field.name] = value
+    return datacls(**values)
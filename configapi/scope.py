@@ -1,4 +1,4 @@
-from typing import Union, Tuple, KeysView, ItemsView, ValuesView
+from typing import Union, Tuple, List, Callable, Iterable, Hashable, Mapping, Optional, KeysView, ItemsView, ValuesView
 from types import ModuleType
 from pathlib import Path
 
@@ -8,18 +8,29 @@ from .sources import (
     InMemoryConfigSource,
     FileConfigSource,
     PackageResourceConfigSource,
-    NotWritableException)
+    NotWritableException,
+    SourceChangedException)
 from .patcher import Patcher, PatcherType
+from .diff import ConfigDiff, MISSING
+from .schema import Schema
+from .pmap import PersistentConfigDict
+from .arrays import copy_configs
 
 
 SourceType = Union[ConfigSource, str, Path, Tuple[ModuleType, str], Tuple[str, str], ConfigDict]
+ListenerType = Callable[['Scope', ConfigDiff], None]
+
+SAVE_ATTEMPTS = 3
 
 
 class Scope(object):
-    __slots__ = ('_source', '_patcher', '_autosave_updates', '_configs', '_version')
+    __slots__ = ('_source', '_patcher', '_autosave_updates', '_configs', '_version', '_listeners', '_schema',
+                 '_fingerprint', '_base', '_generation', '_persistent')
 
     def __init__(self, /, source: SourceType, patcher: Patcher = None, *,
                  autosave_updates: bool = None,
+                 schema: Schema = None,
+                 persistent: bool = False,
                  ) -> None:
         if isinstance(source, (str, Path)):
             source = FileConfigSource(source)
@@ -34,6 +45,12 @@ class Scope(object):
         self._autosave_updates: bool = autosave_updates if autosave_updates is not None else self.writable
         self._configs: ConfigDict = None
         self._version: str = None
+        self._listeners: List[ListenerType] = []
+        self._schema: Schema = schema
+        self._fingerprint: Optional[Hashable] = None
+        self._base: ConfigDict = None
+        self._generation: int = 0
+        self._persistent: bool = persistent
 
     @property
     def writable(self) -> bool:
@@ -47,11 +64,45 @@ class Scope(object):
     def source(self) -> ConfigSource:
         return self._source
 
+    @property
+    def schema(self) -> Schema:
+        return self._schema
+
+    @property
+    def persistent(self) -> bool:
+        return self._persistent
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    @property
+    def loaded(self) -> bool:
+        return self._configs is not None
+
+    @property
+    def storage(self) -> Optional[Mapping]:
+        # The mapping holding the configs, for inspection only.
+        return self._configs
+
+    @property
+    def base(self) -> Optional[Mapping]:
+        # The configs as last loaded or saved, kept by writable scopes to merge concurrent changes.
+        return self._base
+
+    def add_listener(self, listener: ListenerType) -> None:
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: ListenerType) -> None:
+        self._listeners.remove(listener)
+
     def load(self) -> None:
-        (self._configs, changed) = self._patcher(self._source.read_dict())
-        if 'version' in self._configs:
-            self._version = self._configs['version']
-            del self._configs['version']
+        (configs, version, changed, fingerprint) = self._read()
+        (previous, self._configs, self._version) = (self._configs, configs, version)
+        self._generation += 1
+        self._remember(fingerprint)
+        if self._listeners:
+            self._notify(ConfigDiff(previous, self._configs))
         if changed and self.autosave_updates:
             self.save()
 
@@ -64,6 +115,18 @@ class Scope(object):
     def values(self) -> ValuesView:
         return self._configs.values()
 
+    def get_many(self, keys: Iterable[KeyType], default: ConfigValue = MISSING) -> ConfigDict:
+        configs = self._configs
+        results = {}
+        for key in keys:
+            if key in configs:
+                results[key] = configs[key]
+            elif default is MISSING:
+                raise KeyError(key)
+            else:
+                results[key] = default
+        return results
+
     def __contains__(self, key: KeyType) -> bool:
         return key in self._configs
 
@@ -72,19 +135,102 @@ class Scope(object):
 
     def __setitem__(self, key: KeyType, value: ConfigValue) -> None:
         self._check_writable()
+        if self._schema is not None:
+            value = self._schema.validate_value(key, value)
+        previous = self._configs.get(key, MISSING)
         self._configs[key] = value
+        self._generation += 1
+        # Equal values of another type (1, 1.0 and True) are still a change of the stored object,
+        # so listeners are told about anything but the very same object; they filter what they need.
+        if self._listeners and previous is not value:
+            self._notify(ConfigDiff.from_changes({key: (previous, value)}))
 
     def __delitem__(self, key: KeyType) -> None:
         self._check_writable()
+        previous = self._configs[key]
         del self._configs[key]
+        self._generation += 1
+        if self._listeners:
+            self._notify(ConfigDiff.from_changes({key: (previous, MISSING)}))
 
     def save(self) -> None:
         self._check_writable()
+        if self._base is None:
+            self._write(None)
+            self._remember(self._source.fingerprint())
+            return
+        # The source re-checks the fingerprint just before replacing the file; if another writer
+        # got in first, its changes are merged and the write is retried.
+        for attempt in range(SAVE_ATTEMPTS):
+            if self._source.fingerprint() != self._fingerprint:
+                self._merge_source()
+            try:
+                fingerprint = self._write(self._fingerprint)
+            except SourceChangedException:
+                if attempt + 1 == SAVE_ATTEMPTS:
+                    raise
+                continue
+            self._remember(fingerprint if fingerprint is not None else self._source.fingerprint())
+            return
+
+    def _write(self, expected: Optional[Hashable]) -> Optional[Hashable]:
         if self._version is not None:
             self._configs['version'] = self._version
-        self._source.write_dict(self._configs)
-        if 'version' in self._configs:
-            del self._configs['version']
+        try:
+            if expected is None:
+                return self._source.write_dict(self._configs)
+            return self._source.write_dict(self._configs, expected=expected)
+        finally:
+            if 'version' in self._configs:
+                del self._configs['version']
+
+    def checkpoint(self) -> Mapping:
+        # O(1) with persistent storage, which shares all nodes with the live configs.
+        if self._persistent:
+            return self._configs.snapshot()
+        return copy_configs(self._configs)
+
+    def restore(self, checkpoint: Mapping) -> None:
+        self._check_writable()
+        previous = self._configs
+        self._configs = PersistentConfigDict(checkpoint) if self._persistent else copy_configs(checkpoint)
+        self._generation += 1
+        if self._listeners:
+            self._notify(ConfigDiff(previous, self._configs))
+
+    def _read(self) -> Tuple[ConfigDict, str, bool, Optional[Hashable]]:
+        fingerprint = self._source.fingerprint()
+        (configs, changed) = self._patcher(self._source.read_dict())
+        version = configs.pop('version', self._version)
+        if self._schema is not None:
+            self._schema.validate(configs)
+        if self._persistent:
+            configs = PersistentConfigDict(configs)
+        return configs, version, changed, fingerprint
+
+    def _remember(self, fingerprint: Optional[Hashable]) -> None:
+        # Remember what the source looked like, to detect and merge concurrent changes on save.
+        # Read-only scopes are never saved and do not need the copy.
+        self._fingerprint = fingerprint
+        self._base = self._configs.copy() if fingerprint is not None and self.writable else None
+
+    def _merge_source(self) -> None:
+        # The source was changed since it was loaded: apply local changes on top of its current contents.
+        (configs, _, _, fingerprint) = self._read()
+        for (key, (_, value)) in ConfigDiff(self._base, self._configs).items():
+            if value is MISSING:
+                configs.pop(key, None)
+            else:
+                configs[key] = value
+        (previous, self._configs) = (self._configs, configs)
+        self._generation += 1
+        self._remember(fingerprint)
+        if self._listeners:
+            self._notify(ConfigDiff(previous, self._configs))
+
+    def _notify(self, diff: ConfigDiff) -> None:
+        for listener in tuple(self._listeners):
+            listener(self, diff)
 
     def _check_writable(self) -> None:
         if not self.writable:
@@ -2,34 +2,64 @@ from abc import abstractmethod, ABC
 from types import ModuleType
 from pathlib import Path
 from pkgutil import get_data
-from typing import Union, Tuple
-from copy import deepcopy
+from typing import Union, Tuple, Hashable, Optional
+import os
 
 from .types import ConfigDict
-from .toml import parse_configs, format_configs
+from .toml import parse_configs, format_configs, flat_dict, nested_dict
+from .arrays import copy_configs, as_list
+from .codecs import Codec, TOML, find_codec
+from .lazy import SectionsType, scan_toml_sections, parse_configs_lazy
 
 
 class NotWritableException(Exception):
     pass
 
 
+class SourceChangedException(Exception):
+    pass
+
+
 class ConfigSource(ABC):
-    __slots__ = ('_read_only',)
+    __slots__ = ('_read_only', '_compact_arrays', '_codec')
 
-    def __init__(self, read_only: bool = False):
+    def __init__(self, read_only: bool = False, compact_arrays: bool = False, codec: Codec = None):
         self._read_only = read_only
+        self._compact_arrays = compact_arrays
+        self._codec: Optional[Codec] = codec if codec is not TOML else None
 
     def read_dict(self) -> ConfigDict:
-        return parse_configs(self.read_toml())
+        # read_toml()/write_toml() carry the encoded file contents, in whichever format the codec uses.
+        if self._codec is None:
+            return parse_configs(self.read_toml(), compact_arrays=self._compact_arrays)
+        return flat_dict(self._codec.loads(self.read_toml()), compact_arrays=self._compact_arrays)
     
-    def write_dict(self, configs_dict: ConfigDict):
+    def write_dict(self, configs_dict: ConfigDict, expected: Hashable = None) -> Optional[Hashable]:
+        # Sources with fingerprints only write if they still match 'expected', and return the new fingerprint.
         if self.read_only:
             raise NotWritableException(f"{type(self).__name__} is not writeable.")
-        self.write_toml(format_configs(configs_dict))
+        self.write_toml(self.format_dict(configs_dict))
+        return None
+
+    def format_dict(self, configs_dict: ConfigDict) -> str:
+        if self._codec is None:
+            return format_configs(configs_dict)
+        return self._codec.dumps(nested_dict({key: as_list(value) for (key, value) in configs_dict.items()}))
     
     @property
     def read_only(self) -> bool:
         return self._read_only
+
+    @property
+    def compact_arrays(self) -> bool:
+        return self._compact_arrays
+
+    @property
+    def codec(self) -> Codec:
+        return self._codec if self._codec is not None else TOML
+
+    def fingerprint(self) -> Optional[Hashable]:
+        return None
     
     @abstractmethod
     def read_toml(self) -> str:
@@ -61,43 +91,130 @@ class InMemoryConfigSource(ConfigSource):
     def write_toml(self, configs_toml: str):
         self.write_dict(parse_configs(configs_toml))
 
-    def write_dict(self, configs_dict: ConfigDict):
+    def write_dict(self, configs_dict: ConfigDict, expected: Hashable = None) -> Optional[Hashable]:
         if self.read_only:
             raise NotWritableException(f"{type(self).__name__} is not writeable.")
         self._configs.clear()
-        self._configs.update(deepcopy(configs_dict))
+        self._configs.update(copy_configs(configs_dict))
+        return None
 
     def read_dict(self) -> ConfigDict:
-        return deepcopy(self._configs)
+        return copy_configs(self._configs, compact_arrays=self._compact_arrays)
 
 
 class FileConfigSource(ConfigSource):
-    __slots__ = ('_file',)
+    __slots__ = ('_file', '_atomic', '_fsync', '_lazy', '_sections')
     
-    def __init__(self, file: Union[str, Path], **kwargs):
+    def __init__(self, file: Union[str, Path], *,
+                 atomic: bool = True,
+                 fsync: bool = False,
+                 lazy: bool = False,
+                 codec: Codec = None,
+                 **kwargs):
         self._file = Path(file)
-        super(FileConfigSource, self).__init__(**kwargs)
+        self._atomic: bool = atomic
+        self._fsync: bool = fsync
+        self._lazy: bool = lazy
+        self._sections: Tuple[Hashable, Optional[SectionsType]] = None
+        super(FileConfigSource, self).__init__(codec=codec if codec is not None else find_codec(file), **kwargs)
     
     @property
     def file(self) -> Path:
         return self._file
+
+    @property
+    def atomic(self) -> bool:
+        return self._atomic
+
+    @property
+    def fsync(self) -> bool:
+        return self._fsync
+
+    @property
+    def lazy(self) -> bool:
+        return self._lazy
+
+    def read_dict(self) -> ConfigDict:
+        if not self._lazy or self._codec is not None:
+            return super(FileConfigSource, self).read_dict()
+        fingerprint = self.fingerprint()
+        configs_toml = self.read_toml()
+        # Section offsets remain valid for as long as the file is unchanged.
+        if self._sections is None or self._sections[0] != fingerprint:
+            self._sections = (fingerprint, scan_toml_sections(configs_toml))
+        if self._sections[1] is None:
+            return parse_configs(configs_toml, compact_arrays=self._compact_arrays)
+        return parse_configs_lazy(configs_toml, self._sections[1], compact_arrays=self._compact_arrays)
+
+    def fingerprint(self) -> Optional[Hashable]:
+        try:
+            stat = self._file.stat()
+        except FileNotFoundError:
+            return ()
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
     
     def read_toml(self) -> str:
         return self._file.read_text() if self._file.exists() else ''
+
+    def write_dict(self, configs_dict: ConfigDict, expected: Hashable = None) -> Optional[Hashable]:
+        if self.read_only:
+            raise NotWritableException(f"{type(self).__name__} is not writeable.")
+        return self._write(self.format_dict(configs_dict), expected)
     
     def write_toml(self, configs_toml: str) -> None:
-        self._file.write_text(configs_toml)
+        self._write(configs_toml, None)
+
+    def _write(self, configs_toml: str, expected: Optional[Hashable]) -> Hashable:
+        if not self._atomic:
+            self._check_fingerprint(expected)
+            self._file.write_text(configs_toml)
+            return self.fingerprint()
+        # Write to a sibling file and rename it over the target, so readers see either
+        # the old or the new contents, never a partially written file.
+        # A symlinked file is written through the link, by renaming next to its target.
+        target = Path(os.path.realpath(self._file))
+        tmp = target.with_name(f".{target.name}.{os.urandom(4).hex()}.tmp")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        try:
+            with open(fd, 'w') as f:
+                f.write(configs_toml)
+                if self._fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            if target.exists():
+                os.chmod(tmp, target.stat().st_mode & 0o7777)
+            # Renaming keeps the inode, size and mtime, so this is the fingerprint of the written file.
+            stat = tmp.stat()
+            # Checked as late as possible, but another process can still write between this check and the rename.
+            self._check_fingerprint(expected)
+            os.replace(tmp, target)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        if self._fsync and hasattr(os, 'O_DIRECTORY'):
+            fd = os.open(target.parent, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _check_fingerprint(self, expected: Optional[Hashable]) -> None:
+        if expected is not None and self.fingerprint() != expected:
+            raise SourceChangedException(f"'{self._file}' was changed by another writer.")
 
 
 class PackageResourceConfigSource(ConfigSource):
     __slots__ = ('_resource', '_encoding')
     
-    def __init__(self, module: Union[str, ModuleType], resource: str, encoding: str = 'utf8'):
+    def __init__(self, module: Union[str, ModuleType], resource: str, encoding: str = 'utf8',
+                 compact_arrays: bool = False, codec: Codec = None):
         if isinstance(module, ModuleType):
             module = module.__name__
         self._resource: Tuple[str, str] = (module, resource)
         self._encoding: str = encoding
-        super(PackageResourceConfigSource, self).__init__(read_only=True)
+        super(PackageResourceConfigSource, self).__init__(read_only=True, compact_arrays=compact_arrays,
+                                                          codec=codec if codec is not None else find_codec(resource))
     
     @property
     def resource(self) -> Tuple[str,str]:
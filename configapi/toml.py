@@ -1,7 +1,5 @@
-from tomli import loads
-from tomli_w import dumps
-
 from .types import TOMLDict, TOMLValue, ConfigDict, KeyType
+from .arrays import compact_array, as_list
 
 
 class KeyCollisionException(Exception):
@@ -16,20 +14,24 @@ class KeyCollisionException(Exception):
 
 
 def parse_toml(toml_str : str) -> TOMLDict:
+    from tomli import loads  # Deferred, as importing the parser is comparatively slow.
     return loads(toml_str)
 
 
 def format_toml(toml_dict : TOMLDict) -> str:
+    from tomli_w import dumps  # Deferred, as importing the writer is comparatively slow.
     return dumps(toml_dict)
 
 
-def flat_dict(nested_dict : TOMLDict) -> ConfigDict:
+def flat_dict(nested_dict : TOMLDict, compact_arrays : bool = False) -> ConfigDict:
     flat = {}
     def _flatten(nested : TOMLDict, base:str=''):
         if len(base) > 0: base += '.'
         for (key, value) in nested.items():
             if isinstance(value, dict):
                 _flatten(value, base=base+key)
+            elif compact_arrays and type(value) is list:
+                flat[base+key] = compact_array(value)
             else:
                 flat[base+key] = value
     _flatten(nested_dict)
@@ -57,9 +59,9 @@ def nested_dict(flat_dict : ConfigDict) -> TOMLDict:
     return nested
 
 
-def parse_configs(toml_str : str) -> ConfigDict:
-    return flat_dict(parse_toml(toml_str))
+def parse_configs(toml_str : str, compact_arrays : bool = False) -> ConfigDict:
+    return flat_dict(parse_toml(toml_str), compact_arrays=compact_arrays)
 
 
 def format_configs(config_dict : ConfigDict) -> str:
-    return format_toml(nested_dict(config_dict))
+    return format_toml(nested_dict({key: as_list(value) for (key, value) in config_dict.items()}))
@@ -0,0 +1,79 @@
+from unittest.mock import patch
+
+from pytest import mark, param, raises, importorskip
+
+from configapi.arrays import compact_array, is_compact, as_list, copy_configs, COMPACT_MIN_LENGTH
+from configapi.toml import parse_configs, format_configs
+
+
+INTS = list(range(COMPACT_MIN_LENGTH))
+FLOATS = [i / 2 for i in INTS]
+
+
+@mark.parametrize('values', [
+    param(INTS, id='int'),
+    param(FLOATS, id='float'),
+])
+@patch('configapi.arrays._NUMPY', False)
+def test_compact_array(values):
+    compact = compact_array(values)
+    assert is_compact(compact)
+    assert isinstance(compact, memoryview)
+    assert compact.readonly
+    assert len(compact) == len(values)
+    assert compact[3] == values[3]
+    assert as_list(compact) == values
+    with raises(TypeError):
+        compact[0] = values[1]
+
+
+@mark.parametrize('values', [
+    param(INTS[:-1], id='short'),
+    param(INTS[:-1] + [0.5], id='mixed'),
+    param([True] * COMPACT_MIN_LENGTH, id='bool'),
+    param(['a'] * COMPACT_MIN_LENGTH, id='str'),
+    param([2 ** 64] * COMPACT_MIN_LENGTH, id='overflow'),
+    param((1,) * COMPACT_MIN_LENGTH, id='tuple'),
+])
+@patch('configapi.arrays._NUMPY', False)
+def test_compact_array_unchanged(values):
+    assert compact_array(values) is values
+    assert not is_compact(values)
+    assert as_list(values) is values
+
+
+def test_compact_array_numpy():
+    numpy = importorskip('numpy')
+    with patch('configapi.arrays._NUMPY', None):
+        compact = compact_array(FLOATS)
+        assert isinstance(compact, numpy.ndarray)
+        assert not compact.flags.writeable
+        assert is_compact(compact)
+        assert as_list(compact) == FLOATS
+
+
+@patch('configapi.arrays._NUMPY', False)
+def test_copy_configs():
+    compact = compact_array(INTS)
+    nested = {'x': [1]}
+    configs = {'a': compact, 'b': list(FLOATS), 'c': nested}
+
+    copy = copy_configs(configs)
+    assert copy['a'] is compact
+    assert copy['b'] == FLOATS and copy['b'] is not configs['b']
+    assert copy['c'] == nested and copy['c']['x'] is not nested['x']
+
+    copy = copy_configs(configs, compact_arrays=True)
+    assert copy['a'] is compact
+    assert isinstance(copy['b'], memoryview)
+    assert configs['b'] == FLOATS
+
+
+@patch('configapi.arrays._NUMPY', False)
+def test_parse_format_configs_compact():
+    toml = f'a.b = {INTS}\na.c = [1, 2]\n'
+    configs = parse_configs(toml, compact_arrays=True)
+    assert isinstance(configs['a.b'], memoryview)
+    assert configs['a.c'] == [1, 2]
+    assert parse_configs(toml)['a.b'] == INTS
+    assert parse_configs(format_configs(configs)) == {'a.b': INTS, 'a.c': [1, 2]}
@@ -0,0 +1,82 @@
+from re import escape
+from unittest.mock import patch
+
+from pytest import mark, param, raises, importorskip
+
+from configapi.codecs import Codec, TOML, JSON, INI, YAML, CODECS, find_codec, register_codec
+from configapi.toml import flat_dict, nested_dict
+
+
+NESTED = {'a': {'b': 1, 'c': {'d': 'x', 'e': True}}, 'f': {'g': 0.5}}
+
+
+@mark.parametrize('file, codec', [
+    param('configs.toml', TOML, id='toml'),
+    param('configs.JSON', JSON, id='json'),
+    param('configs.ini', INI, id='ini'),
+    param('configs.cfg', INI, id='cfg'),
+    param('configs.yml', YAML, id='yml'),
+    param('dir.json/configs', None, id='none'),
+])
+def test_find_codec(file, codec):
+    assert find_codec(file) is codec
+
+
+def test_register_codec():
+    codec = Codec('upper', lambda text: {'a': {'b': text.upper()}}, lambda nested: nested['a']['b'].lower())
+    with patch.dict(CODECS):
+        register_codec('UP', codec)
+        assert find_codec('x.up') is codec
+        assert flat_dict(codec.loads('xyz')) == {'a.b': 'XYZ'}
+    assert find_codec('x.up') is None
+    assert repr(codec) == "Codec('upper')"
+
+
+@mark.parametrize('codec', [TOML, JSON, YAML])
+@mark.parametrize('orjson', [None, False])
+def test_Codec_roundtrip(codec, orjson):
+    if codec is YAML:
+        importorskip('yaml')
+    with patch('configapi.codecs._ORJSON', orjson):
+        text = codec.dumps(NESTED)
+        assert codec.loads(text) == NESTED
+        assert codec.loads('') == {}
+
+
+def test_JSON_compatible():
+    text = '{"a": {"b": [1, 2], "c": "x"}}'
+    assert flat_dict(JSON.loads(text)) == {'a.b': [1, 2], 'a.c': 'x'}
+    with patch('configapi.codecs._ORJSON', False):
+        assert JSON.loads(JSON.dumps({'a': 'ä'})) == {'a': 'ä'}
+
+
+def test_INI():
+    text = INI.dumps(nested_dict({'a.b': 1, 'a.c.D': True, 'e.f': 'x'}))
+    assert text == '[a]\nb = 1\n\n[a.c]\nD = true\n\n[e]\nf = x\n\n'
+    assert flat_dict(INI.loads(text)) == {'a.b': '1', 'a.c.D': 'true', 'e.f': 'x'}
+    assert INI.loads('[a]\nb = %(c)s\n') == {'a': {'b': '%(c)s'}}
+    with raises(ValueError):
+        INI.dumps({'a': 1})
+    with raises(TypeError):
+        INI.dumps({'a': {'b': [1]}})
+
+
+@mark.parametrize('codec, text', [
+    param(JSON, '[1, 2]', id='json'),
+    param(JSON, '"text"', id='json_scalar'),
+    param(YAML, '- 1\n- 2\n', id='yaml'),
+])
+def test_Codec_top_level(codec, text):
+    if codec is YAML:
+        importorskip('yaml')
+    with raises(ValueError, match=f'{codec.name.upper()} config file must be a mapping, not'):
+        codec.loads(text)
+
+
+@mark.parametrize('text, path', [
+    param('{"a": {"b": 1, "c": null}}', 'a.c', id='value'),
+    param('{"a": [1, [2, null]]}', 'a[1][1]', id='array'),
+])
+def test_Codec_null(text, path):
+    with raises(ValueError, match=escape(f"JSON config files cannot hold null values: '{path}'.")):
+        JSON.loads(text)
@@ -1,9 +1,19 @@
+import asyncio
+from threading import Thread
+import tracemalloc
+from dataclasses import dataclass
+from io import StringIO
+from json import loads
 from pathlib import Path
 
-from pytest import raises
+from pytest import raises, mark
 
 from configapi.types import ConfigDict
 from configapi.configs import Configs
+from configapi.diff import ConfigDiff, MISSING
+from configapi.schema import Schema, Field, ValidationException
+from configapi.toml import format_configs
+from configapi.sources import FileConfigSource
 
 from . import files
 
@@ -55,3 +65,434 @@ def test_Configs_errors():
     with raises(AttributeError) as exc_info:
         _ = configs.not_main
     assert type(exc_info.value) == AttributeError
+
+
+def test_Configs_subscribe():
+    configs = Configs({
+        'default': {'database.host': 'localhost', 'database.port': 5432, 'cache.size': 10},
+        'user': {'database.port': 6543},
+    })
+    configs.load()
+
+    events = []
+    configs.subscribe('database.', events.append)
+
+    @configs.subscribe('cache.size')
+    def _cache(diff: ConfigDiff) -> None:
+        events.append(('cache', diff))
+
+    configs.default['database.port'] = 1234
+    assert events == []
+
+    configs.default['database.host'] = 'remote'
+    assert events.pop().changes == {'database.host': ('localhost', 'remote')}
+
+    del configs.user['database.port']
+    assert events.pop().changes == {'database.port': (6543, 1234)}
+
+    configs.user['database.port'] = 1234
+    assert events == []
+
+    configs.user['cache.size'] = 20
+    (tag, diff) = events.pop()
+    assert tag == 'cache'
+    assert diff.modified == {'cache.size': (10, 20)}
+
+    configs.load()
+    assert len(events) == 2
+    assert {'database.host': ('remote', 'localhost'), 'database.port': (1234, 6543)} in \
+        [e.changes for e in events if isinstance(e, ConfigDiff)]
+    assert ('cache', ConfigDiff.from_changes({'cache.size': (20, 10)})) in events
+
+    events.clear()
+    configs.unsubscribe('database.', events.append)
+    configs.unsubscribe('cache.size', _cache)
+    configs.default['database.host'] = 'other'
+    configs.load()
+    assert events == []
+
+
+def test_Configs_interpolate():
+    configs = Configs({
+        'default': {'db.host': 'localhost', 'db.url': 'db://${db.host}:${db.port}'},
+        'user': {'db.port': 5432, 'db.name': 'name is ${db.url}'},
+    }, interpolate=True)
+    assert configs.interpolate
+    configs.load()
+
+    assert configs['db.url'] == 'db://localhost:5432'
+    assert configs.get('db.name', source=True) == ('name is db://localhost:5432', 'user')
+    assert dict(configs.items())['db.name'] == 'name is db://localhost:5432'
+    assert configs.default['db.url'] == 'db://${db.host}:${db.port}'
+
+    configs.user['db.host'] = 'remote'
+    assert configs['db.name'] == 'name is db://remote:5432'
+
+    configs.default['db.port'] = 1
+    assert configs['db.url'] == 'db://remote:5432'
+
+    configs.user.load()
+    assert configs['db.url'] == 'db://localhost:5432'
+
+    configs.default['db.url'] = 'url'
+    configs.load()
+    assert configs['db.name'] == 'name is db://localhost:5432'
+    assert not Configs().interpolate
+
+
+def test_Configs_override():
+    configs = Configs({'main': {'feature.x': False, 'feature.y': 1, 'url': '${feature.y}/x'}}, interpolate=True)
+    configs.load()
+    assert configs['url'] == '1/x'
+
+    with configs.override({'feature.x': True, 'feature.z': 'new'}) as overridden:
+        assert overridden is configs
+        assert configs['feature.x'] is True
+        assert configs.get('feature.z', source=True, scope=True) == ('new', None, None)
+        assert 'feature.z' in configs
+        assert configs.main['feature.x'] is False
+        with configs.override({'feature.y': 2}):
+            assert configs['url'] == '2/x'
+            assert dict(configs.items()) == {'feature.x': True, 'feature.y': 2, 'feature.z': 'new', 'url': '2/x'}
+        assert configs['feature.y'] == 1
+        assert configs['url'] == '1/x'
+
+    assert configs['feature.x'] is False
+    assert 'feature.z' not in configs
+    assert configs['url'] == '1/x'
+
+
+def test_Configs_override_context_local():
+    configs = Configs({'main': {'feature.x': False}})
+    configs.load()
+    seen = {}
+
+    async def _task(name, value):
+        with configs.override({'feature.x': value}):
+            await asyncio.sleep(0)
+            seen[name] = configs['feature.x']
+
+    async def _main():
+        await asyncio.gather(_task('a', 'a'), _task('b', 'b'))
+
+    asyncio.run(_main())
+    assert seen == {'a': 'a', 'b': 'b'}
+
+    with configs.override({'feature.x': True}):
+        thread = Thread(target=lambda: seen.update(thread=configs['feature.x']))
+        thread.start()
+        thread.join()
+        assert configs['feature.x'] is True
+    assert seen['thread'] is False
+
+
+def test_Configs_schema():
+    schema = Schema({
+        'db.port': Field(int, default=5432, minimum=1),
+        'db.host': str,
+    })
+    configs = Configs({
+        'default': {'db.host': 'localhost'},
+        'user': {'db.port': '6543'},
+    }, schema=schema)
+    assert configs.schema is schema
+    assert configs.user.schema is schema
+    configs.load()
+
+    assert configs['db.port'] == 6543
+    assert configs.get('db.port', source=True) == (6543, 'user')
+    assert 'db.port' not in configs.default
+
+    del configs.user['db.port']
+    assert configs.get('db.port', source=True) == (5432, None)
+    assert dict(configs.items()) == {'db.host': 'localhost', 'db.port': 5432}
+
+    configs.user['db.port'] = '1'
+    assert configs['db.port'] == 1
+    with raises(ValidationException):
+        configs.user['db.port'] = 0
+    assert configs['db.port'] == 1
+
+    @dataclass
+    class Database:
+        host: str
+        port: int = 0
+
+    assert configs.bind(Database, 'db') == Database('localhost', 1)
+
+
+def test_Configs_schema_errors():
+    configs = Configs({'main': {'a': 'x'}}, schema=Schema({'a': int}))
+    with raises(ValidationException):
+        configs.load()
+    assert not configs.main.loaded
+
+    configs = Configs({'main': {}}, schema=Schema({'a': int}))
+    with raises(ValidationException) as exc_info:
+        configs.load()
+    assert exc_info.value.errors == {'a': 'is required'}
+
+
+def test_Configs_get_many():
+    configs = Configs({
+        'default': {'a': 1, 'b': 2, 'c': '${a}'},
+        'user': {'b': 3},
+    }, interpolate=True)
+    configs.load()
+
+    result = configs.get_many(['c', 'b', 'a'])
+    assert result == {'c': 1, 'b': 3, 'a': 1}
+    assert list(result) == ['c', 'b', 'a']
+    assert configs.get_many(['a', 'b'], source=True) == {'a': (1, 'default'), 'b': (3, 'user')}
+    assert configs.get_many(['a', 'x'], default=0, source=True) == {'a': (1, 'default'), 'x': (0, None)}
+    assert configs.get_many([]) == {}
+    with raises(KeyError) as exc_info:
+        configs.get_many(['a', 'x'])
+    assert exc_info.value.args == ('x',)
+
+    with configs.override({'a': 5}):
+        assert configs.get_many(['a', 'c']) == {'a': 5, 'c': 5}
+
+
+def test_Configs_dump():
+    configs = Configs({
+        'default': {'a.b': 1, 'a.c': 'x'},
+        'user': {'a.b': 2, 'd': True},
+    })
+    configs.load()
+
+    fp = StringIO()
+    configs.dump(fp)
+    assert fp.getvalue() == 'd = true\n\n[a]\nb = 2\nc = "x"\n'
+
+    fp = StringIO()
+    configs.dump(fp, format='json', sources=True)
+    assert loads(fp.getvalue()) == {
+        'a': {'b': {'value': 2, 'source': 'user'}, 'c': {'value': 'x', 'source': 'default'}},
+        'd': {'value': True, 'source': 'user'},
+    }
+
+    with raises(ValueError):
+        configs.dump(StringIO(), format='yaml')
+
+
+def test_Configs_generation():
+    configs = Configs({'default': {'a': 1}})
+    assert configs.generation == 1
+    configs.add_source('user', {})
+    assert configs.generation == 2
+    configs.load()
+    assert configs.generation == 4
+    configs.user['a'] = 1
+    assert configs.generation == 5
+    configs.user['a'] = 1
+    assert configs.generation == 5
+    configs.user['a'] = True
+    assert configs.generation == 6
+
+
+def test_Configs_equal_value_of_other_type():
+    configs = Configs({'main': {'x': 1, 'y': '${x}', 'z': '${x}!'}}, interpolate=True)
+    configs.load()
+    diffs = []
+    configs.subscribe('x', diffs.append)
+    assert (configs['y'], configs['z']) == (1, '1!')
+
+    configs.main['x'] = True
+    assert dict(configs.items()) == {'x': True, 'y': True, 'z': 'True!'}
+    assert (configs['y'], configs['z']) == (True, 'True!')
+    out = StringIO()
+    configs.dump(out, format='toml')
+    assert 'x = true' in out.getvalue()
+    assert diffs == []
+
+
+def test_Configs_cached():
+    configs = Configs({'default': {'a': 1, 'b': 2, 'c': 3}, 'user': {}})
+    configs.load()
+    calls = []
+
+    @configs.cached(keys=['a', 'b', 'missing'])
+    def derived(factor, offset=0):
+        calls.append(factor)
+        return (configs['a'] + configs['b']) * factor + offset
+
+    assert derived.__name__ == 'derived'
+    assert derived(2) == 6
+    assert derived(2) == 6
+    assert derived(3) == 9
+    assert derived(2, offset=1) == 7
+    assert calls == [2, 3, 2]
+
+    configs.default['c'] = 4
+    configs.user['a'] = 1
+    assert derived(2) == 6
+    assert calls == [2, 3, 2]
+
+    configs.user['b'] = 5
+    assert derived(2) == 12
+    assert calls == [2, 3, 2, 2]
+
+    with configs.override({'a': 0}):
+        assert derived(2) == 10
+        assert derived(2) == 10
+    assert derived(2) == 12
+    assert calls == [2, 3, 2, 2, 2, 2]
+
+    configs.user['missing'] = True
+    assert derived(2) == 12
+    assert calls[-1:] == [2] and len(calls) == 7
+
+    derived.cache_clear()
+    assert derived(2) == 12
+    assert len(calls) == 8
+
+
+def test_Configs_priority():
+    configs = Configs({'base': {'a': 1, 'b': 1}, 'user': {'b': 2, 'c': 2}}, interpolate=True)
+    configs.load()
+    diffs = []
+    configs.subscribe('', diffs.append)
+    assert configs.priority == ('base', 'user')
+    assert dict(configs.items()) == {'a': 1, 'b': 2, 'c': 2}
+
+    tenant = configs.insert_source('tenant', {'b': 3, 'd': '${b}'}, before='user')
+    assert configs.priority == ('base', 'tenant', 'user')
+    tenant.load()
+    assert [diff.changes for diff in diffs] == [{'d': (MISSING, '${b}')}]
+    assert (configs['b'], configs['d'], configs.source('d')) == (2, 2, 'tenant')
+
+    diffs.clear()
+    generation = configs.generation
+    configs.move_source('tenant', after='user')
+    assert configs.priority == ('base', 'user', 'tenant')
+    assert configs.generation > generation
+    assert [diff.changes for diff in diffs] == [{'b': (2, 3)}]
+    assert (configs['b'], configs['d'], configs.source('b')) == (3, 3, 'tenant')
+    assert dict(configs.items()) == {'a': 1, 'b': 3, 'c': 2, 'd': 3}
+
+    diffs.clear()
+    configs.move_source('user', before='base')
+    assert configs.priority == ('user', 'base', 'tenant')
+    assert diffs == []
+    configs.move_source('tenant', before='user')
+    assert [diff.changes for diff in diffs] == [{'b': (3, 1)}]
+    assert (configs['b'], configs['d'], configs.source('b')) == (1, 1, 'base')
+
+    diffs.clear()
+    generation = configs.generation
+    base = configs.remove_source('base')
+    assert configs.priority == ('tenant', 'user')
+    assert configs.generation > generation
+    assert [diff.changes for diff in diffs] == [{'a': (1, MISSING), 'b': (1, 2)}]
+    assert 'a' not in configs
+    assert (configs['b'], configs['d'], configs.source('b')) == (2, 2, 'user')
+    with raises(AttributeError):
+        _ = configs.base
+
+    diffs.clear()
+    generation = configs.generation
+    base['b'] = 4
+    assert (configs.generation, diffs) == (generation, [])
+    configs.user['b'] = 5
+    assert (configs['b'], configs['d']) == (5, 5)
+
+
+def test_Configs_priority_errors():
+    configs = Configs({'main': {}})
+    with raises(ValueError):
+        configs.add_source('main', {})
+    with raises(KeyError):
+        configs.insert_source('other', {}, before='missing')
+    with raises(ValueError):
+        configs.insert_source('other', {}, before='main', after='main')
+    with raises(KeyError):
+        configs.move_source('missing', before='main')
+    with raises(KeyError):
+        configs.remove_source('missing')
+    configs.move_source('main', before='main')
+    assert configs.priority == ('main',)
+
+    configs.add_source('other', {})
+    with raises(KeyError):
+        configs.move_source('main', before='missing')
+    with raises(ValueError):
+        configs.move_source('main', before='other', after='other')
+    with raises(ValueError):
+        configs.move_source('main', before='main', after='other')
+    assert configs.priority == ('main', 'other')
+
+
+def test_Configs_merged_view():
+    schema = Schema({'a': Field(int, default=0), 'd': Field(int, default=4)})
+    configs = Configs({'base': {'a': 1, 'b': 1}, 'user': {'b': 2, 'c': 3}}, schema=schema)
+    configs.load()
+
+    keys = configs.keys()
+    assert keys == {'a', 'b', 'c', 'd'} and len(configs) == 4
+    assert keys & {'a', 'x'} == {'a'}
+    assert set(configs) == set(keys)
+    assert sorted(configs.values()) == [1, 2, 3, 4]
+    assert dict(configs.items()) == {'a': 1, 'b': 2, 'c': 3, 'd': 4}
+    assert sorted(configs.items(source=True)) == [('a', 1, 'base'), ('b', 2, 'user'), ('c', 3, 'user'),
+                                                  ('d', 4, None)]
+    assert sorted(configs.items(scope=True), key=str) == sorted([('a', 1, configs.base), ('b', 2, configs.user),
+                                                                 ('c', 3, configs.user), ('d', 4, None)], key=str)
+    items = configs.items()
+    assert configs.items() == items
+
+    configs.user['a'] = 5
+    del configs.user['c']
+    assert dict(items) == {'a': 1, 'b': 2, 'c': 3, 'd': 4}
+    assert dict(configs.items()) == {'a': 5, 'b': 2, 'd': 4}
+    assert configs.keys() == {'a', 'b', 'd'} and len(configs) == 3
+    assert ('a', 5, 'user', configs.user) in set(configs.items(source=True, scope=True))
+
+    with configs.override({'x': 9, 'b': 8}):
+        assert dict(configs.items()) == {'a': 5, 'b': 8, 'd': 4, 'x': 9}
+        assert configs.keys() == {'a', 'b', 'd', 'x'} and len(configs) == 4
+        assert ('b', 8, None) in set(configs.items(source=True))
+    assert len(configs) == 3
+
+    interpolated = Configs({'main': {'a': 'x', 'b': '${a}y'}}, interpolate=True)
+    interpolated.load()
+    assert dict(interpolated.items()) == {'a': 'x', 'b': 'xy'}
+    assert list(interpolated.values()) == ['x', 'xy']
+    assert interpolated.keys() == {'a', 'b'}
+
+
+@mark.parametrize('format', ['toml', 'json'])
+def test_Configs_dump_memory(format):
+    class _Sink(object):
+        def write(self, text):
+            pass
+
+    configs = Configs({'main': {f'section{i // 50}.group{i % 7}.key{i}': i / 2 for i in range(20000)}})
+    configs.load()
+    merged = dict(configs.items())
+
+    def _peak(func):
+        tracemalloc.start()
+        try:
+            func()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    assert _peak(lambda: configs.dump(_Sink(), format=format, sources=True)) < _peak(lambda: format_configs(merged)) / 2
+
+
+def test_Configs_reload_lazy(fs):
+    fs.create_file('lazy.toml', contents='[a]\nx = 1\n[b]\ny = 2\n[c]\nz = 3\n')
+    configs = Configs({'main': {'a.x': 0, 'd': 4}})
+    lazy = configs.add_source('lazy', FileConfigSource('lazy.toml', lazy=True))
+    configs.load()
+    assert dict(configs.items()) == {'a.x': 1, 'b.y': 2, 'c.z': 3, 'd': 4}
+
+    lazy.load()
+    assert configs['a.x'] == 1
+    assert set(lazy._configs.pending) == {'b', 'c'}
+    assert (configs['d'], configs.source('a.x')) == (4, 'lazy')
+    assert dict(configs.items()) == {'a.x': 1, 'b.y': 2, 'c.z': 3, 'd': 4}
+    configs.main['d'] = 5
+    assert configs['d'] == 5
@@ -0,0 +1,62 @@
+from pytest import mark
+
+from configapi.diff import ConfigDiff, MISSING, matches, values_equal
+
+
+def test_ConfigDiff():
+    diff = ConfigDiff({'a.b': 1, 'a.c': [0, 1], 'd': True},
+                      {'a.b': 2, 'a.c': [0, 1], 'e': 'new'})
+    assert diff.deferred
+    assert diff.added == {'e': 'new'}
+    assert not diff.deferred
+    assert diff.removed == {'d': True}
+    assert diff.modified == {'a.b': (1, 2)}
+    assert set(diff.keys()) == {'a.b', 'd', 'e'}
+    assert diff['d'] == (True, MISSING)
+    assert 'a.c' not in diff
+    assert len(diff) == 3
+    assert diff
+
+
+def test_ConfigDiff_empty():
+    diff = ConfigDiff({'a': 1}, {'a': 1})
+    assert not diff
+    assert diff == ConfigDiff()
+    assert not ConfigDiff(None, None)
+    assert not ConfigDiff.from_changes({}).deferred
+
+
+def test_ConfigDiff_filter():
+    diff = ConfigDiff.from_changes({
+        'database.host': ('a', 'b'),
+        'database.port': (MISSING, 5432),
+        'databases': (1, 2),
+        'cache.size': (1, MISSING),
+    })
+    assert set(diff.filter('database.')) == {'database.host', 'database.port'}
+    assert set(diff.filter('databases')) == {'databases'}
+    assert set(diff.filter('database')) == set()
+    assert diff.filter('') == diff
+
+
+@mark.parametrize('key, pattern, expected', [
+    ('a.b', 'a.b', True),
+    ('a.b', 'a.', True),
+    ('a.b', 'a', False),
+    ('ab', 'a.', False),
+    ('a.b', '', True),
+])
+def test_matches(key, pattern, expected):
+    assert matches(key, pattern) == expected
+
+
+def test_values_equal():
+    class Ambiguous(object):
+        def __eq__(self, other):
+            raise ValueError()
+
+    value = Ambiguous()
+    assert values_equal(value, value)
+    assert not values_equal(value, Ambiguous())
+    assert values_equal([0, 1], [0, 1])
+    assert not values_equal(1, MISSING)
@@ -0,0 +1,104 @@
+from datetime import date
+from io import StringIO
+from json import loads
+
+from pytest import mark, raises, param, importorskip
+
+from configapi.dump import dump_toml, dump_json, format_toml_value
+from configapi.toml import parse_toml, flat_dict, KeyCollisionException
+from configapi.arrays import compact_array, COMPACT_MIN_LENGTH
+
+
+ENTRIES = [
+    ('repo.urls.origin', 'localhost', 'user'),
+    ('name', 'Example', 'default'),
+    ('repo.remote', True, 'default'),
+    ('repo.timeout', 30, 'user'),
+    ('repo.a-b.c d', [1.5, 2.0], 'default'),
+    ('env', [{'content': {'labels': ['dev', 'test']}}], 'default'),
+    ('project.version', 1.4, 'default'),
+    ('project.released', date(2024, 1, 2), 'default'),
+]
+CONFIGS = {key: value for (key, value, _) in ENTRIES}
+SOURCES = {key: source for (key, _, source) in ENTRIES}
+
+
+@mark.parametrize('value, expected', [
+    param(True, 'true', id='bool'),
+    param(3, '3', id='int'),
+    param(0.5, '0.5', id='float'),
+    param(float('-inf'), '-inf', id='inf'),
+    param(float('nan'), 'nan', id='nan'),
+    param('a"b\\c\n\x01\x7f', '"a\\"b\\\\c\\n\\u0001\\u007f"', id='str'),
+    param([1, [2]], '[1, [2]]', id='array'),
+    param({'a b': {}, 'c': 1}, '{ "a b" = {}, c = 1 }', id='table'),
+    param(date(2024, 1, 2), '2024-01-02', id='date'),
+])
+def test_format_toml_value(value, expected):
+    assert format_toml_value(value) == expected
+    assert parse_toml(f'x = {expected}')['x'] == value or value != value
+
+
+def test_format_toml_value_compact():
+    values = list(range(COMPACT_MIN_LENGTH))
+    assert format_toml_value(compact_array(values)) == format_toml_value(values)
+
+
+def test_format_toml_value_numpy():
+    numpy = importorskip('numpy')
+    assert format_toml_value(numpy.array([1, 2], dtype=numpy.int64)) == '[1, 2]'
+    assert format_toml_value(numpy.array([1.5, 2.0], dtype=numpy.float64)) == '[1.5, 2.0]'
+    fp = StringIO()
+    dump_toml({'a.b': numpy.arange(3, dtype=numpy.float64)}, fp)
+    assert fp.getvalue() == '[a]\nb = [0.0, 1.0, 2.0]\n'
+
+
+def test_format_toml_value_error():
+    with raises(TypeError):
+        format_toml_value(object())
+
+
+def test_dump_toml():
+    fp = StringIO()
+    dump_toml(CONFIGS, fp, sources=SOURCES)
+    text = fp.getvalue()
+    assert flat_dict(parse_toml(text)) == CONFIGS
+    assert text.startswith('env = [{ content = { labels = ["dev", "test"] } }]  # default\nname = "Example"  # default\n')
+    assert '\n[repo]\nremote = true  # default\ntimeout = 30  # user\n\n[repo.a-b]\n"c d" = [1.5, 2.0]' in text
+
+    fp = StringIO()
+    dump_toml({}, fp)
+    assert fp.getvalue() == ''
+
+    fp = StringIO()
+    dump_toml({'a.a': 1, 'a.b.c': 2, 'a.c': 3, 'a-b.x': 4, 'z': 5}, fp)
+    assert fp.getvalue() == 'z = 5\n\n[a]\na = 1\nc = 3\n\n[a-b]\nx = 4\n\n[a.b]\nc = 2\n'
+
+
+def test_dump_json():
+    fp = StringIO()
+    dump_json(CONFIGS, fp)
+    assert flat_dict(loads(fp.getvalue())) == {
+        key: (value.isoformat() if isinstance(value, date) else value) for (key, value) in CONFIGS.items()}
+
+    fp = StringIO()
+    dump_json({key: CONFIGS[key] for key in ('repo.urls.origin', 'name')}, fp, sources=SOURCES)
+    assert loads(fp.getvalue()) == {
+        'name': {'value': 'Example', 'source': 'default'},
+        'repo': {'urls': {'origin': {'value': 'localhost', 'source': 'user'}}},
+    }
+
+    fp = StringIO()
+    dump_json({}, fp)
+    assert loads(fp.getvalue()) == {}
+
+
+@mark.parametrize('dump', [dump_toml, dump_json])
+@mark.parametrize('entries, collision_key', [
+    param({'repo': 1, 'repo.name': 2}, 'repo', id='value_table'),
+    param({'a.b': 1, 'a.b.c.d': 2}, 'a.b', id='nested'),
+])
+def test_dump_collisions(dump, entries, collision_key):
+    with raises(KeyCollisionException) as exc_info:
+        dump(entries, StringIO())
+    assert exc_info.value.key == collision_key
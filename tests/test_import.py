@@ -0,0 +1,33 @@
+import subprocess
+import sys
+
+from pytest import mark
+
+
+DEFERRED_MODULES = {'tomli', 'tomli_w', 'packaging', 'packaging.version', 'dataclasses'}
+
+
+def imported_modules(code: str):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            capture_output=True, text=True, check=True)
+    lines = [line for line in result.stderr.splitlines() if line.startswith('import time:')]
+    return {line.rsplit('|', 1)[1].strip() for line in lines[1:]}
+
+
+def test_import_defers_heavy_modules():
+    modules = imported_modules('import configapi')
+    assert 'configapi.configs' in modules
+    assert modules.isdisjoint(DEFERRED_MODULES)
+
+
+@mark.parametrize('code, expected', [
+    ('configapi.Configs({"a": {"b": 1}}).load()', set()),
+    ('configapi.toml.parse_configs("a = 1")', {'tomli'}),
+    ('configapi.toml.format_configs({"a": 1})', {'tomli_w'}),
+    ('configapi.Configs().patch("1.0")(lambda c: c)', {'packaging.version'}),
+])
+def test_import_on_first_use(code, expected):
+    modules = imported_modules(f'import configapi, configapi.toml; {code}')
+    assert modules & DEFERRED_MODULES >= expected
+    if not expected:
+        assert modules.isdisjoint(DEFERRED_MODULES)
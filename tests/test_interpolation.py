@@ -0,0 +1,98 @@
+from threading import Barrier, Thread
+from time import sleep
+
+from pytest import raises
+
+from configapi.interpolation import Interpolator, InterpolationCycleException
+
+
+def make_interpolator(configs):
+    lookups = []
+
+    def _lookup(key):
+        lookups.append(key)
+        return configs[key]
+
+    return Interpolator(_lookup), lookups
+
+
+def test_Interpolator_resolve():
+    configs = {
+        'host': 'localhost',
+        'port': 5432,
+        'url': 'db://${host}:${port}/x',
+        'alias': '${port}',
+        'escaped': 'cost: $$5, $${host}',
+        'plain': 'no references',
+    }
+    interpolator, lookups = make_interpolator(configs)
+    assert interpolator.resolve('url') == 'db://localhost:5432/x'
+    assert interpolator.resolve('alias') == 5432
+    assert interpolator.resolve('escaped') == 'cost: $5, ${host}'
+    assert interpolator.resolve('plain') == 'no references'
+
+    lookups.clear()
+    assert interpolator.resolve('url') == 'db://localhost:5432/x'
+    assert lookups == []
+    assert len(interpolator) == 6
+
+
+def test_Interpolator_invalidate():
+    configs = {'a': 'x', 'b': '${a}-b', 'c': '${b}-c', 'd': 'd'}
+    interpolator, lookups = make_interpolator(configs)
+    assert interpolator.resolve('c') == 'x-b-c'
+    assert interpolator.resolve('d') == 'd'
+
+    configs['a'] = 'y'
+    assert interpolator.invalidate(['a']) == {'a', 'b', 'c'}
+    lookups.clear()
+    assert interpolator.resolve('d') == 'd'
+    assert lookups == []
+    assert interpolator.resolve('c') == 'y-b-c'
+
+    interpolator.clear()
+    assert len(interpolator) == 0
+
+
+def test_Interpolator_errors():
+    configs = {'a': '${b}', 'b': 'x${c}', 'c': '${a}', 'd': '${missing}'}
+    interpolator, _ = make_interpolator(configs)
+
+    with raises(InterpolationCycleException) as exc_info:
+        interpolator.resolve('a')
+    assert exc_info.value.cycle == ['a', 'b', 'c', 'a']
+    assert str(exc_info.value) == 'Cyclic reference: a -> b -> c -> a.'
+    assert len(interpolator) == 0
+
+    with raises(KeyError) as exc_info:
+        interpolator.resolve('d')
+    assert exc_info.value.args == ('missing',)
+
+
+def test_Interpolator_threads():
+    configs = {f'k{i}': f'${{k{i + 1}}}' for i in range(50)}
+    configs['k50'] = 'end'
+    errors = []
+
+    def _lookup(key):
+        sleep(0)  # Encourage thread switches in the middle of a resolution.
+        return configs[key]
+
+    interpolator = Interpolator(_lookup)
+
+    def _read():
+        barrier.wait()
+        try:
+            assert interpolator.resolve('k0') == 'end'
+        except Exception as e:
+            errors.append(e)
+
+    for _ in range(50):
+        interpolator.clear()
+        barrier = Barrier(4)
+        threads = [Thread(target=_read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert errors == []
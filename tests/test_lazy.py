@@ -0,0 +1,130 @@
+from pytest import mark, param, raises
+from tomli import TOMLDecodeError
+
+from configapi.lazy import LazyConfigDict, scan_toml_sections, parse_configs_lazy, ROOT
+from configapi.toml import parse_configs
+
+
+DOCUMENT = '''
+version = "1.0"
+root.dotted = 1  # [not.a.header]
+multi = """
+[not.a.header]
+\\
+  x""""
+literal = \'\'\'
+[not.a.header]\'\'\'\'
+array = [
+  [1, 2],
+  [3]
+]
+inline = { a = "]", b = [] }
+
+[database]
+host = "localhost"
+
+[[servers]]
+name = 'a'
+[servers.tls]
+enabled = true
+
+[ "cache.local" . size ]
+value = 10
+
+[database.pool]
+size = 5
+'''
+
+
+def test_scan_toml_sections():
+    sections = scan_toml_sections(DOCUMENT)
+    assert set(sections) == {ROOT, 'database', 'servers', 'cache'}
+    assert len(sections['database']) == 2
+    assert len(sections['servers']) == 2
+    for (name, spans) in sections.items():
+        for (start, end) in spans:
+            assert start == 0 or DOCUMENT[start - 1] == '\n'
+            if name != ROOT:
+                assert DOCUMENT[start] == '['
+    assert sum(end - start for spans in sections.values() for (start, end) in spans) == len(DOCUMENT)
+
+
+@mark.parametrize('text', [
+    param('', id='empty'),
+    param('a = 1\nb.c = "x"', id='root_only'),
+    param(DOCUMENT, id='document'),
+])
+def test_parse_configs_lazy(text):
+    lazy = parse_configs_lazy(text)
+    assert dict(lazy.items()) == parse_configs(text)
+
+
+@mark.parametrize('text', [
+    param('a = "unterminated', id='string'),
+    param('a = ]', id='unbalanced'),
+    param('["a\\u0062"]\nx = 1', id='escaped_header'),
+    param('[""]\nx = 1', id='empty_header'),
+    param('[a b]\nx = 1', id='invalid_header'),
+])
+def test_scan_toml_sections_unsupported(text):
+    assert scan_toml_sections(text) is None
+
+
+def test_LazyConfigDict():
+    loads = []
+
+    def _loader(name, configs):
+        def _load():
+            loads.append(name)
+            return configs
+        return _load
+
+    lazy = LazyConfigDict({'version': '1'}, {
+        'a': _loader('a', {'a.x': 1, 'a.y': 2}),
+        'b': _loader('b', {'b.x': 3}),
+        'c': _loader('c', {'c.x': 4}),
+    })
+    assert set(lazy.pending) == {'a', 'b', 'c'}
+    assert lazy['version'] == '1'
+    assert loads == []
+
+    assert lazy['a.x'] == 1
+    assert 'a.z' not in lazy
+    assert lazy.get('a.z', 0) == 0
+    assert loads == ['a']
+
+    lazy['b.x'] = 5
+    assert loads == ['a', 'b']
+    assert lazy['b.x'] == 5
+
+    assert lazy.keys() & {'a.y', 'b.y'} == {'a.y'}
+    assert loads == ['a', 'b']
+
+    copy = lazy.copy()
+    del lazy['a.y']
+    assert 'a.y' in copy
+    assert set(copy.pending) == {'c'}
+
+    assert len(lazy) == 4
+    assert loads == ['a', 'b', 'c']
+    assert dict(lazy.items()) == {'version': '1', 'a.x': 1, 'b.x': 5, 'c.x': 4}
+    assert set(lazy.values()) == {'1', 1, 5, 4}
+    assert 'pending=[]' in repr(lazy)
+
+
+@mark.parametrize('text', [
+    param('a = 1\n[a.b]\nc = 1\n', id='value_table'),
+    param('a = {x = 1}\n[a]\ny = 2\n', id='inline_table'),
+])
+def test_parse_configs_lazy_invalid(text):
+    with raises(TOMLDecodeError):
+        parse_configs(text)
+    with raises(TOMLDecodeError):
+        parse_configs_lazy(text)
+
+
+def test_parse_configs_lazy_shared_root():
+    text = 'a.x = 1\n[a.b]\nc = 2\n[d]\ne = 3\n'
+    configs = parse_configs_lazy(text)
+    assert not isinstance(configs, LazyConfigDict)
+    assert configs == parse_configs(text) == {'a.x': 1, 'a.b.c': 2, 'd.e': 3}
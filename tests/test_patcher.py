@@ -30,6 +30,13 @@ def test_Patcher_target_version():
     assert p.target_version == Version('5.2.1')
 
 
+def test_Patcher_invalid_target_version():
+    p = Patcher(target_version='not a version')
+    with raises(ValueError):
+        p.register(version='1.0.0', patch=empty_patch())
+    assert len(list(iter(p))) == 0
+
+
 def test_Patcher_register():
     mocks = {v: empty_patch() for v in ['1.0.5', '1.7.2']}
     
@@ -0,0 +1,103 @@
+from random import Random
+
+from pytest import raises, mark
+
+from configapi.pmap import PersistentMap, PersistentConfigDict
+from configapi.diff import MISSING
+
+
+class Colliding(object):
+
+    def __init__(self, name, hash_value=42):
+        (self.name, self.hash_value) = (name, hash_value)
+
+    def __hash__(self):
+        return self.hash_value
+
+    def __eq__(self, other):
+        return isinstance(other, Colliding) and self.name == other.name
+
+    def __repr__(self):
+        return f'Colliding({self.name!r})'
+
+
+def test_PersistentMap():
+    empty = PersistentMap()
+    assert len(empty) == 0
+    assert dict(empty) == {}
+
+    first = empty.set('a.b', 1)
+    second = first.set('a.c', 2).set('a.b', 3)
+    assert dict(empty) == {}
+    assert dict(first) == {'a.b': 1}
+    assert dict(second) == {'a.b': 3, 'a.c': 2}
+    assert 'a.c' in second and 'a.c' not in first
+    assert second.get('missing', 0) == 0
+    assert second.set('a.c', second['a.c']) is second
+
+    third = second.delete('a.b')
+    assert dict(third) == {'a.c': 2}
+    assert len(third) == 1
+    with raises(KeyError):
+        third.delete('a.b')
+    with raises(KeyError):
+        _ = third['a.b']
+    assert dict(third.delete('a.c')) == {}
+    assert PersistentMap(second) == second
+    assert repr(first) == "PersistentMap({'a.b': 1})"
+
+
+@mark.parametrize('seed', [0, 1, 2])
+def test_PersistentMap_random(seed):
+    rng = Random(seed)
+    reference = {}
+    pmap = PersistentMap({f'init.{i}': i for i in range(200)})
+    reference.update({f'init.{i}': i for i in range(200)})
+    snapshots = []
+    for step in range(3000):
+        key = rng.choice([f'init.{rng.randrange(300)}', Colliding(rng.randrange(5)), rng.randrange(-50, 50)])
+        if rng.random() < 0.4 and key in reference:
+            pmap = pmap.delete(key)
+            del reference[key]
+        else:
+            pmap = pmap.set(key, step)
+            reference[key] = step
+        if step % 500 == 0:
+            snapshots.append((pmap, dict(reference)))
+    assert dict(pmap) == reference
+    assert len(pmap) == len(reference) == len(list(pmap))
+    for (snapshot, expected) in snapshots:
+        assert dict(snapshot) == expected
+        changed = {key: (old, new) for (key, old, new) in snapshot.changed_items(pmap)}
+        assert changed == {key: (expected.get(key, MISSING), reference.get(key, MISSING))
+                           for key in expected.keys() | reference.keys()
+                           if expected.get(key, MISSING) != reference.get(key, MISSING)}
+
+
+def test_PersistentMap_collisions():
+    (a, b, c) = (Colliding('a'), Colliding('b'), Colliding('c', hash_value=42 + (1 << 20)))
+    pmap = PersistentMap().set(a, 1).set(b, 2).set(c, 3)
+    assert (pmap[a], pmap[b], pmap[c]) == (1, 2, 3)
+    assert Colliding('d') not in pmap
+    pmap = pmap.set(b, 4)
+    assert dict(pmap) == {a: 1, b: 4, c: 3}
+    assert dict(pmap.delete(a)) == {b: 4, c: 3}
+    assert dict(pmap.delete(a).delete(b)) == {c: 3}
+    assert dict(PersistentMap({a: 1, b: 2})) == {a: 1, b: 2}
+
+
+def test_PersistentConfigDict():
+    configs = PersistentConfigDict({'a': 1})
+    snapshot = configs.snapshot()
+    copy = configs.copy()
+
+    configs['b'] = 2
+    del configs['a']
+    assert dict(configs) == {'b': 2}
+    assert configs.get('a') is None
+    assert 'b' in configs and len(configs) == 1
+    assert dict(snapshot) == dict(copy) == {'a': 1}
+    assert PersistentConfigDict(snapshot).snapshot() is snapshot
+    assert list(copy.changed_items(configs)) in ([('a', 1, MISSING), ('b', MISSING, 2)],
+                                                 [('b', MISSING, 2), ('a', 1, MISSING)])
+    assert repr(copy) == "PersistentConfigDict({'a': 1})"
@@ -0,0 +1,96 @@
+from array import array
+from pathlib import Path
+from unittest.mock import patch
+
+from configapi.configs import Configs
+from configapi.scope import Scope
+from configapi.sources import FileConfigSource
+from configapi.arrays import compact_array
+from configapi.profile import deep_sizeof, scope_memory, allocations, duplicates, profile, format_report, main
+
+
+def test_deep_sizeof():
+    shared = 'x' * 1000
+    assert deep_sizeof([shared, shared]) < 2 * len(shared)
+    assert deep_sizeof({'a': [shared]}) > len(shared)
+    seen = set()
+    assert deep_sizeof(shared, seen) > 1000
+    assert deep_sizeof([shared], seen) < 100
+    view = memoryview(array('d', range(100)))
+    assert deep_sizeof(view) >= 800
+
+
+def test_scope_memory():
+    configs = Configs({'a': {'x': 'a' * 100, 'y': list(range(100))}, 'b': {}})
+    configs.load()
+    memory = scope_memory('a', configs.a)
+    assert (memory.name, memory.keys) == ('a', 2)
+    assert memory.value_bytes > 100 and memory.array_bytes > 800 and memory.storage_bytes > 0
+    assert memory.base_bytes == 0
+    assert memory.total == (memory.key_bytes + memory.value_bytes + memory.array_bytes + memory.storage_bytes
+                            + memory.base_bytes)
+    assert scope_memory('b', Configs({'b': {}}).b).keys == 0
+
+
+def test_scope_memory_base(fs):
+    fs.create_file('configs.toml', contents='\n'.join(f'k{i} = {i}' for i in range(1000)))
+    read_only = Scope(FileConfigSource('configs.toml', read_only=True))
+    writable = Scope(FileConfigSource('configs.toml'))
+    read_only.load()
+    writable.load()
+    assert scope_memory('r', read_only).base_bytes == 0
+    memory = scope_memory('w', writable)
+    assert memory.base_bytes >= memory.storage_bytes > 1000 * 8
+
+
+def test_allocations():
+    result = allocations('test', lambda: [object() for _ in range(1000)])
+    assert result.phase == 'test'
+    assert result.peak > 1000 * 16
+    assert abs(result.blocks) < 100
+    kept = []
+    result = allocations('test', lambda: kept.extend(object() for _ in range(1000)))
+    assert result.blocks >= 1000 and result.retained > 1000 * 16
+
+
+@patch('configapi.arrays._NUMPY', False)
+def test_duplicates_compact():
+    (a, b, c) = (compact_array(list(range(100))), compact_array(list(range(100))), compact_array(list(range(1, 101))))
+    found = duplicates([('a', {'x': a, 'y': c}), ('b', {'x': b, 'z': compact_array([i / 2 for i in range(100)])})])
+    assert [(d.copies, d.keys) for d in found] == [(2, ('a:x', 'b:x'))]
+    assert found[0].wasted >= 800
+
+
+def test_duplicates():
+    shared = ['s'] * 10
+    found = duplicates([('a', {'x': ''.join(['v'] * 200), 'y': [1, 2], 'z': shared, 'b': True}),
+                        ('b', {'x': ''.join(['v'] * 200), 'y': [1, 2], 'z': shared, 'b': True})])
+    assert [(d.copies, d.keys) for d in found] == [(2, ('a:x', 'b:x')), (2, ('a:y', 'b:y'))]
+    assert found[0].wasted > 200
+
+
+def test_profile(fs, capsys):
+    fs.create_file('one.toml', contents='version = "1"\n[a]\nx = "hello"\ny = [1, 2, 3]\n')
+    fs.create_file('two.json', contents='{"a": {"x": "hello"}, "b": {"z": 1}}')
+    configs = Configs({'one': 'one.toml', 'two': Path('two.json')})
+    report = profile(configs)
+    assert [s.name for s in report.scopes] == ['one', 'two']
+    assert [s.keys for s in report.scopes] == [2, 2]
+    assert [a.phase for a in report.allocations] == ['load', 'items', 'save']
+    assert report.cache_bytes > 0
+    assert [s.base_bytes > 0 for s in report.scopes] == [True, True]
+    assert [d.keys for d in report.duplicates] == [('one:a.x', 'two:a.x')]
+    text = format_report(report)
+    assert 'one' in text and 'save' in text and "'hello'" in text
+
+    contents = Path('one.toml').read_text()
+    main(['one.toml', 'two.json', '--persistent'])
+    assert Path('one.toml').read_text() == contents
+    output = capsys.readouterr().out
+    assert output.startswith('scope') and 'two.json' in output
+
+    fs.create_file('arrays.toml', contents=f'a = {list(range(100))}\nb = {list(range(100))}\n')
+    with patch('configapi.arrays._NUMPY', False):
+        main(['arrays.toml', '--compact-arrays', '--writable'])
+    output = capsys.readouterr().out
+    assert 'arrays.toml:a, arrays.toml:b' in output
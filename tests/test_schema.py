@@ -0,0 +1,119 @@
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from pytest import mark, raises, param
+
+from configapi.schema import Schema, Field, ValidationException, bind
+from configapi.diff import MISSING
+
+
+@mark.parametrize('field, value, expected', [
+    param(Field(int), 5, 5, id='int'),
+    param(Field(int), '5', 5, id='int_from_str'),
+    param(Field(int), 5.0, 5, id='int_from_float'),
+    param(Field(float), 5, 5.0, id='float_from_int'),
+    param(Field(float), '0.5', 0.5, id='float_from_str'),
+    param(Field(bool), 'yes', True, id='bool_from_str'),
+    param(Field(bool), False, False, id='bool'),
+    param(Field(str, choices=['a', 'b']), 'b', 'b', id='choices'),
+    param(Field(int, minimum=0, maximum=10), 10, 10, id='range'),
+    param(Field(List[int]), [1, 2], [1, 2], id='generic'),
+    param(Field(tuple), (1, 2), (1, 2), id='tuple'),
+    param(Field(Optional[int]), '3', 3, id='optional'),
+    param(Field(minimum=1), 3, 3, id='untyped'),
+])
+def test_Field_compile(field, value, expected):
+    result = field.compile()(value)
+    assert result == expected
+    assert type(result) == type(expected)
+
+
+@mark.parametrize('field, value', [
+    param(Field(int), True, id='int_from_bool'),
+    param(Field(int), 0.5, id='int_from_float'),
+    param(Field(int), 'x', id='int_from_str'),
+    param(Field(float), 'x', id='float_from_str'),
+    param(Field(bool), 'maybe', id='bool_from_str'),
+    param(Field(str), 1, id='str_from_int'),
+    param(Field(str, choices=['a', 'b']), 'c', id='choices'),
+    param(Field(int, minimum=0), -1, id='minimum'),
+    param(Field(int, maximum=0), 1, id='maximum'),
+    param(Field(minimum=0), 'x', id='not_comparable'),
+    param(Field(list), 1, id='other_type'),
+    param(Field(list), 'abc', id='list_from_str'),
+    param(Field(tuple), 'abc', id='tuple_from_str'),
+    param(Field(dict), [('a', 1)], id='dict_from_list'),
+])
+def test_Field_compile_errors(field, value):
+    with raises(ValueError):
+        field.compile()(value)
+
+
+def test_Field():
+    field = Field(int, default=3, minimum=1, maximum=5, choices=[1, 3, 5])
+    assert (field.type, field.default, field.minimum, field.maximum, field.choices) == (int, 3, 1, 5, [1, 3, 5])
+    assert not field.required
+    assert Field().required
+
+
+def test_Schema_validate():
+    schema = Schema({
+        'db.port': Field(int, default=5432, minimum=1, maximum=65535),
+        'db.host': str,
+        'log.level': Field(str, choices=['debug', 'info']),
+    })
+    assert 'db.port' in schema
+    assert set(schema.fields) == {'db.port', 'db.host', 'log.level'}
+    assert schema.defaults == {'db.port': 5432}
+
+    configs = {'db.port': '80', 'other': 'x'}
+    assert schema.validate(configs) is configs
+    assert configs == {'db.port': 80, 'other': 'x'}
+    assert schema.validate_value('db.port', 1.0) == 1
+    assert schema.validate_value('other', 1.0) == 1.0
+
+    with raises(ValidationException) as exc_info:
+        schema.validate({'db.port': 0, 'db.host': 1, 'log.level': 'info'})
+    assert set(exc_info.value.errors) == {'db.port', 'db.host'}
+    assert str(exc_info.value).startswith("Invalid configs: 'db.port' is smaller than 1: 0; ")
+
+    with raises(ValidationException) as exc_info:
+        schema.validate_value('log.level', 'trace')
+    assert set(exc_info.value.errors) == {'log.level'}
+
+    with raises(ValidationException) as exc_info:
+        schema.check_required({'db.host': 'localhost'})
+    assert exc_info.value.errors == {'log.level': 'is required'}
+
+
+def test_Schema_invalid_default():
+    with raises(ValidationException) as exc_info:
+        Schema({'a': Field(int, default='x')})
+    assert set(exc_info.value.errors) == {'a'}
+
+
+@dataclass
+class Database:
+    host: str = 'localhost'
+    port: int = field(default=5432, metadata={'minimum': 1, 'other': 'ignored'})
+
+
+@dataclass
+class Settings:
+    name: str
+    database: Database
+    tags: List[str] = field(default_factory=list)
+
+
+def test_Schema_from_dataclass():
+    schema = Schema.from_dataclass(Settings, prefix='app')
+    assert set(schema.fields) == {'app.name', 'app.database.host', 'app.database.port', 'app.tags'}
+    assert schema.fields['app.name'].required
+    assert schema.fields['app.database.port'].minimum == 1
+    assert schema.defaults == {'app.database.host': 'localhost', 'app.database.port': 5432, 'app.tags': []}
+
+
+def test_bind():
+    configs = {'name': 'x', 'database.port': 1}
+    settings = bind(Settings, lambda key: configs.get(key, MISSING))
+    assert settings == Settings(name='x', database=Database(port=1))
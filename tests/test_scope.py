@@ -1,16 +1,18 @@
 from pathlib import Path
 
 from pytest import raises, mark
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 from configapi.scope import Scope
 from configapi.patcher import Patcher
+from configapi.diff import MISSING
 from configapi.sources import (
     ConfigSource,
     FileConfigSource,
     InMemoryConfigSource,
     PackageResourceConfigSource,
     NotWritableException,
+    SourceChangedException,
 )
 
 from . import files
@@ -55,6 +57,7 @@ def test_Scope_load(changed: bool, read_only: bool, autosave_updates: bool, writ
 
     source: ConfigSource = MagicMock(spec=ConfigSource)
     source.read_dict.return_value = cfgs_orig
+    source.fingerprint.return_value = None
     source.read_only = read_only
 
     scope: Scope = Scope(source, patcher, autosave_updates=autosave_updates)
@@ -117,3 +120,189 @@ def test_Scope_dict(fs):
 
     del scope['project.name']
     assert set(scope.values()) == {0}
+
+
+def test_Scope_listeners():
+    scope: Scope = Scope({'a.b': 1, 'a.c': 2})
+    events = []
+    listener = lambda s, diff: events.append((s, diff))
+    scope.add_listener(listener)
+
+    scope.load()
+    (source, diff) = events.pop()
+    assert source is scope
+    assert diff.added == {'a.b': 1, 'a.c': 2}
+
+    scope['a.b'] = 1
+    assert events == []
+    scope['a.b'] = 3
+    assert events.pop()[1].modified == {'a.b': (1, 3)}
+    del scope['a.c']
+    assert events.pop()[1].removed == {'a.c': 2}
+
+    scope.load()
+    assert events.pop()[1].changes == {'a.b': (3, 1), 'a.c': (MISSING, 2)}
+
+    scope.remove_listener(listener)
+    scope['a.b'] = 5
+    assert events == []
+
+
+def test_Scope_get_many():
+    scope: Scope = Scope({'a.b': 1, 'a.c': 2})
+    scope.load()
+    assert scope.get_many(['a.c', 'a.b']) == {'a.c': 2, 'a.b': 1}
+    assert scope.get_many(['a.b', 'x'], default=None) == {'a.b': 1, 'x': None}
+    with raises(KeyError) as exc_info:
+        scope.get_many(['a.b', 'x'])
+    assert exc_info.value.args == ('x',)
+
+
+def test_Scope_save_concurrent(fs):
+    cfg_file = Path('./test-cfg.toml')
+    fs.create_file(cfg_file, contents='version = "1.0"\na = 1\nb = 2\nc = 3\n')
+
+    mine: Scope = Scope(cfg_file)
+    theirs: Scope = Scope(cfg_file)
+    mine.load()
+    theirs.load()
+
+    theirs['b'] = 20
+    theirs['d'] = 4
+    theirs.save()
+
+    events = []
+    mine.add_listener(lambda s, diff: events.append(diff))
+    mine['a'] = 10
+    del mine['c']
+    events.clear()
+    mine.save()
+
+    assert dict(mine.items()) == {'a': 10, 'b': 20, 'd': 4}
+    assert events[0].changes == {'b': (2, 20), 'd': (MISSING, 4)}
+    theirs.load()
+    assert dict(theirs.items()) == {'a': 10, 'b': 20, 'd': 4}
+
+    mine['b'] = 0
+    events.clear()
+    mine.save()
+    assert events == []
+    theirs.load()
+    assert theirs['b'] == 0
+    assert 'version = "1.0"' in cfg_file.read_text()
+
+
+def test_Scope_lazy(fs):
+    cfg_file = Path('./test-cfg.toml')
+    fs.create_file(cfg_file, contents='version = "1"\n[a]\nx = 1\n[b]\ny = 2\n')
+
+    scope: Scope = Scope(FileConfigSource(cfg_file, lazy=True))
+    scope.load()
+    assert scope['a.x'] == 1
+    assert set(scope._configs.pending) == {'b'}
+
+    scope['a.x'] = 3
+    scope.save()
+    assert set(scope._configs.pending) == set()
+    assert cfg_file.read_text() == 'version = "1"\n\n[a]\nx = 3\n\n[b]\ny = 2\n'
+
+
+def test_Scope_generation():
+    scope: Scope = Scope({'a': 1})
+    assert scope.generation == 0
+    scope.load()
+    assert scope.generation == 1
+    scope['a'] = 2
+    assert scope.generation == 2
+    del scope['a']
+    assert scope.generation == 3
+    scope.load()
+    assert scope.generation == 4
+
+
+@mark.parametrize('persistent', [False, True])
+def test_Scope_checkpoint(persistent):
+    scope: Scope = Scope({'a': [1, 2], 'b': 2}, persistent=persistent)
+    assert scope.persistent == persistent
+    scope.load()
+    events = []
+    scope.add_listener(lambda s, diff: events.append(diff))
+
+    checkpoint = scope.checkpoint()
+    if persistent:
+        assert scope.checkpoint() is checkpoint
+    scope['b'] = 3
+    scope['c'] = 4
+    del scope['a']
+    assert dict(checkpoint.items()) == {'a': [1, 2], 'b': 2}
+
+    events.clear()
+    generation = scope.generation
+    scope.restore(checkpoint)
+    assert dict(scope.items()) == {'a': [1, 2], 'b': 2}
+    assert scope.generation == generation + 1
+    assert events[0].changes == {'a': (MISSING, [1, 2]), 'b': (3, 2), 'c': (4, MISSING)}
+
+    scope['b'] = 5
+    scope.restore(checkpoint)
+    assert scope['b'] == 2
+
+    read_only: Scope = Scope(InMemoryConfigSource({}, read_only=True), persistent=persistent)
+    read_only.load()
+    with raises(NotWritableException):
+        read_only.restore(read_only.checkpoint())
+
+
+def test_Scope_json(fs):
+    fs.create_file('generated.json', contents='{"version": "2", "a": {"b": [1, 2]}}')
+    scope: Scope = Scope('generated.json')
+    scope.load()
+    assert dict(scope.items()) == {'a.b': [1, 2]}
+    scope['a.c'] = 'x'
+    scope.save()
+    assert Path('generated.json').read_text().lstrip().startswith('{')
+    scope.load()
+    assert dict(scope.items()) == {'a.b': [1, 2], 'a.c': 'x'}
+
+
+def test_Scope_save_race(fs):
+    cfg_file = Path('./test-cfg.toml')
+    fs.create_file(cfg_file, contents='a = 1\nb = 2\n')
+    mine: Scope = Scope(cfg_file)
+    mine.load()
+    source = mine.source
+    format_dict = source.format_dict
+    writes = []
+
+    def _format_dict(configs):
+        # Another process writes after save() checked the fingerprint, but before the rename.
+        if not writes:
+            writes.append(configs)
+            other = FileConfigSource(cfg_file)
+            other.write_dict({**other.read_dict(), 'b': 20, 'c': 3})
+        return format_dict(configs)
+
+    mine['a'] = 10
+    with patch.object(FileConfigSource, 'format_dict', side_effect=_format_dict):
+        mine.save()
+    assert dict(mine.items()) == {'a': 10, 'b': 20, 'c': 3}
+    assert FileConfigSource(cfg_file).read_dict() == {'a': 10, 'b': 20, 'c': 3}
+
+    def _always_changed(configs):
+        cfg_file.write_text(cfg_file.read_text() + '\n')
+        return format_dict(configs)
+
+    mine['a'] = 11
+    with patch.object(FileConfigSource, 'format_dict', side_effect=_always_changed):
+        with raises(SourceChangedException):
+            mine.save()
+
+
+def test_Scope_read_only_base(fs):
+    fs.create_file('test-cfg.toml', contents='a = 1\n')
+    scope: Scope = Scope(FileConfigSource('test-cfg.toml', read_only=True))
+    scope.load()
+    assert scope._base is None
+    writable: Scope = Scope('test-cfg.toml')
+    writable.load()
+    assert writable._base == {'a': 1}
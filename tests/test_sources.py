@@ -11,6 +11,8 @@ from configapi.sources import (
     NotWritableException,
 )
 from configapi.types import ConfigDict
+from configapi.lazy import scan_toml_sections
+from configapi.codecs import TOML, find_codec
 
 from . import files
 
@@ -197,3 +199,126 @@ def test_PackageResourceConfigSource_encoding(get_data, is_default, encoding) ->
 
     get_data.assert_called_once_with('tests.files', testfile)
     decode.assert_called_once_with(encoding)
+
+
+@mark.parametrize('atomic, fsync', [
+    (True, False),
+    (True, True),
+    (False, False),
+])
+def test_FileConfigSource_write_toml_atomic(fs, atomic, fsync) -> None:
+    testfile = Path('configs/test-configs.toml')
+    fs.create_file(testfile, contents='old = true\n')
+    testfile.chmod(0o640)
+
+    src = FileConfigSource(testfile, atomic=atomic, fsync=fsync)
+    assert (src.atomic, src.fsync) == (atomic, fsync)
+    src.write_toml('new = true\n')
+
+    assert testfile.read_text() == 'new = true\n'
+    assert testfile.stat().st_mode & 0o777 == 0o640
+    assert [p.name for p in testfile.parent.iterdir()] == [testfile.name]
+
+
+def test_FileConfigSource_write_toml_symlink(fs) -> None:
+    target = Path('shared/test-configs.toml')
+    fs.create_file(target, contents='old = true\n')
+    link = Path('configs/test-configs.toml')
+    fs.create_symlink(link, '../shared/test-configs.toml')
+
+    src = FileConfigSource(link)
+    src.write_toml('new = true\n')
+
+    assert link.is_symlink()
+    assert target.read_text() == 'new = true\n'
+    assert [p.name for p in target.parent.iterdir()] == [target.name]
+
+
+def test_FileConfigSource_write_toml_failure(fs) -> None:
+    testfile = Path('test-configs.toml')
+    fs.create_file(testfile, contents='old = true\n')
+
+    src = FileConfigSource(testfile)
+    with patch('configapi.sources.os.replace', side_effect=OSError('disk full')):
+        with raises(OSError):
+            src.write_toml('new = true\n')
+
+    assert testfile.read_text() == 'old = true\n'
+    assert [p.name for p in Path('.').iterdir() if p.is_file()] == [testfile.name]
+
+
+def test_FileConfigSource_fingerprint(fs) -> None:
+    testfile = Path('test-configs.toml')
+    src = FileConfigSource(testfile)
+    assert src.fingerprint() == ()
+
+    src.write_toml('a = 1\n')
+    first = src.fingerprint()
+    assert first != ()
+    assert src.fingerprint() == first
+
+    src.write_toml('a = 12\n')
+    assert src.fingerprint() != first
+    assert InMemoryConfigSource().fingerprint() is None
+
+
+def test_FileConfigSource_lazy(fs) -> None:
+    testfile = Path('test-configs.toml')
+    fs.create_file(testfile, contents='version = "1"\n[a]\nx = 1\n[b]\ny = 2\n')
+
+    src = FileConfigSource(testfile, lazy=True)
+    assert src.lazy and not FileConfigSource(testfile).lazy
+    with patch('configapi.sources.scan_toml_sections', wraps=scan_toml_sections) as scan:
+        configs = src.read_dict()
+        assert set(configs.pending) == {'a', 'b'}
+        assert configs['a.x'] == 1
+        assert set(configs.pending) == {'b'}
+        assert dict(configs.items()) == src.read_dict() == {'version': '1', 'a.x': 1, 'b.y': 2}
+        scan.assert_called_once()
+
+        src.write_toml('[a]\nx = 3\n')
+        assert src.read_dict()['a.x'] == 3
+        assert scan.call_count == 2
+
+    fs.create_file('unsupported.toml', contents='["a\\u0062"]\nx = 1\n')
+    assert FileConfigSource('unsupported.toml', lazy=True).read_dict().__class__ is dict
+
+
+@patch('configapi.arrays._NUMPY', False)
+def test_InMemoryConfigSource_compact_arrays():
+    values = list(range(100))
+    src = InMemoryConfigSource({'table': values}, compact_arrays=True)
+    assert src.compact_arrays
+    configs = src.read_dict()
+    assert isinstance(configs['table'], memoryview)
+    assert src.configs['table'] is values
+
+    src.write_dict(configs)
+    assert src.configs['table'] is configs['table']
+    assert src.read_dict()['table'] is configs['table']
+    assert src.read_toml().startswith('table = [')
+
+
+@patch('configapi.arrays._NUMPY', False)
+def test_FileConfigSource_compact_arrays(fs):
+    fs.create_file('test-configs.toml', contents=f'[a]\ntable = {list(range(100))}\n')
+    for lazy in (False, True):
+        src = FileConfigSource('test-configs.toml', lazy=lazy, compact_arrays=True)
+        assert isinstance(src.read_dict()['a.table'], memoryview)
+    assert PackageResourceConfigSource(files, 'x.toml', compact_arrays=True).compact_arrays
+
+
+@mark.parametrize('filename, contents', [
+    param('test-configs.json', '{"a": {"b": 1}, "version": "1"}', id='json'),
+    param('test-configs.ini', '[a]\nb = 1\n[root]\nx = y\n', id='ini'),
+])
+def test_FileConfigSource_codec(fs, filename, contents) -> None:
+    fs.create_file(filename, contents=contents)
+    src = FileConfigSource(filename, lazy=True)
+    assert src.codec is find_codec(filename)
+    configs = src.read_dict()
+    assert configs['a.b'] in (1, '1')
+    src.write_dict(configs)
+    assert src.read_dict() == configs
+    assert FileConfigSource('configs.txt').codec is TOML
+    assert FileConfigSource(filename, codec=TOML).codec is TOML